@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+# Written by build_assets.py; optional, the game falls back to the source PNGs
+PACKED_DIR = os.path.join("assets", "packed")
+MANIFEST_PATH = os.path.join(PACKED_DIR, "manifest.json")
+SOURCE_DIRS = ("", "assets")  # Root directory first (for Pygbag), then assets/
+
+# The browser build has no threads, so decoding is staged on the event loop there
+IS_WEB = sys.platform == "emscripten"
+
+_manifest = None
+_pages = {}
+_raw_pages = {}  # Decoded but not yet converted, filled by decode_all
+_raw_images = {}
+_images = {}  # (name, size) -> sprite in display format
+_decode_seconds = 0.0
+
+
+def load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def _packed_entry(name, size):
+    entry = load_manifest().get("sprites", {}).get(name)
+    if entry and tuple(entry["size"]) == tuple(size):
+        return entry
+    return None
+
+
+def _load_page(filename, opaque):
+    if filename not in _pages:
+        page = _raw_pages.pop(filename, None)
+        if page is None:
+            page = pygame.image.load(os.path.join(PACKED_DIR, filename))
+        # Opaque pages skip the per-pixel alpha blend when blitted
+        _pages[filename] = page.convert() if opaque else page.convert_alpha()
+    return _pages[filename]
+
+
+def load_source(name):
+    """Decode the full-size source image for ``name`` without any conversion"""
+    error = None
+    for directory in SOURCE_DIRS:
+        try:
+            return pygame.image.load(os.path.join(directory, f"{name}.png"))
+        except (pygame.error, FileNotFoundError) as e:
+            error = e
+    raise error
+
+
+def load_image(name, size, opaque=False):
+    """Return sprite ``name`` scaled to ``size`` in display format.
+
+    Uses the pre-scaled packed sprite when the manifest has one of that size,
+    otherwise decodes and scales the source PNG at runtime.
+    """
+    key = (name, tuple(size))
+    if key in _images:
+        return _images[key]
+    entry = _packed_entry(name, size)
+    if entry:
+        page = _load_page(entry["file"], entry["opaque"])
+        if "rect" in entry:
+            return page.subsurface(entry["rect"])
+        return page
+    image = _raw_images.pop(key, None)
+    if image is None:
+        image = pygame.transform.scale(load_source(name), size)
+    return image.convert() if opaque else image.convert_alpha()
+
+
+def _decode_job(job):
+    kind, name, size = job
+    try:
+        if kind == "page":
+            return pygame.image.load(os.path.join(PACKED_DIR, name))
+        return pygame.transform.scale(load_source(name), size)
+    except (pygame.error, FileNotFoundError) as e:
+        print(f"Could not decode {name}: {e}")
+        return None
+
+
+async def decode_all(specs):
+    """Decode every ``(name, size, opaque)`` sprite into raw surfaces.
+
+    Runs on a thread pool on desktop (image decoding releases the GIL) and
+    one asset per event loop step in the browser. Needs no display, so it can
+    run before the window exists; ``convert_all`` finishes the job.
+    """
+    global _decode_seconds
+    start = time.perf_counter()
+    jobs = []
+    for name, size, opaque in specs:
+        entry = _packed_entry(name, size)
+        if entry is None:
+            jobs.append(("image", name, tuple(size)))
+        elif ("page", entry["file"], None) not in jobs and entry["file"] not in _pages:
+            jobs.append(("page", entry["file"], None))
+
+    if IS_WEB:
+        results = []
+        for job in jobs:
+            results.append(_decode_job(job))
+            await asyncio.sleep(0)  # Let the browser breathe between assets
+    else:
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=min(8, len(jobs) or 1)) as pool:
+            results = await asyncio.gather(*(loop.run_in_executor(pool, _decode_job, job) for job in jobs))
+
+    for (kind, name, size), surface in zip(jobs, results):
+        if surface is None:
+            continue
+        if kind == "page":
+            _raw_pages[name] = surface
+        else:
+            _raw_images[(name, size)] = surface
+    _decode_seconds += time.perf_counter() - start
+
+
+def convert_all(specs):
+    """Convert decoded sprites to the display format. Main thread only, after set_mode."""
+    global _decode_seconds
+    if not _raw_pages and not _raw_images:
+        return
+    start = time.perf_counter()
+    count = 0
+    for name, size, opaque in specs:
+        key = (name, tuple(size))
+        if key in _images:
+            continue
+        try:
+            _images[key] = load_image(name, size, opaque)
+            count += 1
+        except (pygame.error, FileNotFoundError):
+            pass  # Reported by decode_all; callers fall back to plain shapes
+    convert_seconds = time.perf_counter() - start
+    print(f"Loaded {count} assets in {(_decode_seconds + convert_seconds) * 1000:.0f} ms "
+          f"(decode {_decode_seconds * 1000:.0f} ms, convert {convert_seconds * 1000:.0f} ms)")
+    _decode_seconds = 0.0
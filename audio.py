@@ -0,0 +1,128 @@
+import math
+import os
+import random
+import time
+from array import array
+
+import pygame
+
+# Optional sound files; sounds without one get a synthesized tone
+SOUND_DIRS = (os.path.join("assets", "sounds"), "sounds")
+SOUND_EXTENSIONS = (".ogg", ".wav")
+
+_sounds = {}  # Loaded once, shared by every SoundPool (a restart builds a new pool)
+
+
+def synthesize(frequency, duration, sweep=1.0, noise=0.0):
+    """A short decaying blip in the mixer's format, or None if it isn't 16 bit.
+
+    The pitch slides from ``frequency`` to ``frequency * sweep``; ``noise``
+    mixes in that share of white noise, for thuds and crackles.
+    """
+    rate, size, channels = pygame.mixer.get_init()
+    if size != -16:
+        return None
+    count = max(1, int(rate * duration))
+    noise_source = random.Random(0)  # Its own generator, so the game's random sequence is untouched
+    samples = array("h")
+    phase = 0.0
+    for i in range(count):
+        t = i / count
+        phase += 2 * math.pi * frequency * (1 + (sweep - 1) * t) / rate
+        value = (1 - noise) * math.sin(phase) + noise * noise_source.uniform(-1, 1)
+        sample = int(value * (1 - t) ** 2 * 12000)
+        samples.extend([sample] * channels)
+    return pygame.mixer.Sound(buffer=samples.tobytes())
+
+
+def load_sound(name, tone):
+    """Sound ``name`` from a file when there is one, otherwise synthesized from ``tone``"""
+    if name not in _sounds:
+        sound = None
+        for directory in SOUND_DIRS:
+            for extension in SOUND_EXTENSIONS:
+                path = os.path.join(directory, name + extension)
+                if sound is None and os.path.exists(path):
+                    try:
+                        sound = pygame.mixer.Sound(path)
+                    except pygame.error as e:
+                        print(f"Could not load sound {path}: {e}")
+        _sounds[name] = sound if sound is not None else synthesize(*tone)
+    return _sounds[name]
+
+
+class SoundEffect:
+    __slots__ = ("sound", "voices", "cooldown", "last_start", "channels")
+
+    def __init__(self, sound, voices, cooldown):
+        self.sound = sound
+        self.voices = voices  # Most copies playing at once
+        self.cooldown = cooldown  # Shortest time between two starts, in seconds
+        self.last_start = -cooldown
+        self.channels = []  # Channels this sound was last started on
+
+
+class SoundPool:
+    """Preloaded sound effects played through a fixed set of mixer channels.
+
+    A dozen towers firing several shots a second would otherwise start more
+    voices than the mixer has. Each sound has a cap on copies playing at
+    once and a cooldown between starts, and the pool never takes a channel
+    from a sound that is still playing. A request that can't be played is
+    dropped; ``played`` and ``dropped`` count every request either way.
+    ``settings`` maps each name to its ``voices``, ``cooldown``, ``volume``
+    and fallback ``tone``.
+    """
+
+    def __init__(self, channels, settings, enabled=True):
+        self.played = 0
+        self.dropped = 0
+        self.effects = {}
+        self.channels = []
+        self.enabled = enabled and self._start_mixer()
+        if not self.enabled:
+            return
+        pygame.mixer.set_num_channels(channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        for name, setting in settings.items():
+            sound = load_sound(name, setting["tone"])
+            if sound is not None:
+                sound.set_volume(setting["volume"])
+                self.effects[name] = SoundEffect(sound, setting["voices"], setting["cooldown"])
+
+    @staticmethod
+    def _start_mixer():
+        if pygame.mixer.get_init():
+            return True
+        try:
+            pygame.mixer.init()
+            return True
+        except pygame.error as e:
+            print(f"Sound disabled: {e}")
+            return False
+
+    def play(self, name):
+        effect = self.effects.get(name)
+        if effect is None:
+            return
+        now = time.perf_counter()
+        if now - effect.last_start < effect.cooldown:
+            self.dropped += 1
+            return
+        effect.channels = [channel for channel in effect.channels
+                           if channel.get_busy() and channel.get_sound() is effect.sound]
+        if len(effect.channels) >= effect.voices:
+            self.dropped += 1
+            return
+        channel = next((channel for channel in self.channels if not channel.get_busy()), None)
+        if channel is None:
+            self.dropped += 1
+            return
+        channel.play(effect.sound)
+        effect.channels.append(channel)
+        effect.last_start = now
+        self.played += 1
+
+    def busy(self):
+        """Channels playing right now"""
+        return sum(1 for channel in self.channels if channel.get_busy())
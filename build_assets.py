@@ -0,0 +1,112 @@
+"""Offline asset build for the web bundle.
+
+Pre-scales every sprite the game uses to its on-screen size, packs the
+alpha sprites into one atlas PNG, stores opaque backgrounds as JPEG and
+writes a manifest that assets.load_image reads at runtime.
+
+    python build_assets.py
+"""
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+from assets import MANIFEST_PATH, PACKED_DIR, load_source
+
+# name: (size, opaque). Sizes match what main.py draws.
+SPRITES = {
+    "archer": ((48, 72), False),
+    "cannon": ((48, 72), False),
+    "magic": ((48, 72), False),
+    "goblin": ((40, 40), False),
+    "orc": ((60, 60), False),
+    "troll": ((50, 50), False),
+    "grass": ((1620, 1080), True),
+    "road": ((60, 60), True),
+}
+ATLAS_FILE = "atlas.png"
+ATLAS_WIDTH = 256
+PADDING = 1  # Keeps neighbouring sprites from bleeding into each other when scaled
+
+
+def pack_shelves(sizes, width):
+    """Place rectangles on horizontal shelves, tallest first"""
+    rects = {}
+    x = y = shelf_height = 0
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: -item[1][1]):
+        if x + w > width:
+            x = 0
+            y += shelf_height + PADDING
+            shelf_height = 0
+        rects[name] = (x, y, w, h)
+        x += w + PADDING
+        shelf_height = max(shelf_height, h)
+    return rects, y + shelf_height
+
+
+def scale(image, size):
+    # smoothscale only handles 24 and 32 bit surfaces
+    if image.get_bitsize() not in (24, 32):
+        image = image.convert(32)
+    return pygame.transform.smoothscale(image, size)
+
+
+def main():
+    start = time.perf_counter()
+    os.makedirs(PACKED_DIR, exist_ok=True)
+    source_bytes = 0
+    manifest = {"version": 1, "sprites": {}}
+    report = []
+
+    atlas_sprites = {}
+    for name, (size, opaque) in SPRITES.items():
+        sprite_start = time.perf_counter()
+        source_path = next(path for path in (f"assets/{name}.png", f"{name}.png") if os.path.exists(path))
+        source_bytes += os.path.getsize(source_path)
+        image = scale(load_source(name), size)
+        if opaque:
+            filename = f"{name}.jpg"
+            pygame.image.save(image, os.path.join(PACKED_DIR, filename))
+            manifest["sprites"][name] = {"file": filename, "size": list(size), "opaque": True}
+        else:
+            atlas_sprites[name] = image
+        report.append((source_path, os.path.getsize(source_path), time.perf_counter() - sprite_start))
+
+    rects, height = pack_shelves({name: image.get_size() for name, image in atlas_sprites.items()},
+                                 ATLAS_WIDTH)
+    atlas = pygame.Surface((ATLAS_WIDTH, height), pygame.SRCALPHA, 32)
+    for name, image in atlas_sprites.items():
+        x, y, w, h = rects[name]
+        atlas.blit(image, (x, y))
+        manifest["sprites"][name] = {"file": ATLAS_FILE, "rect": [x, y, w, h], "size": [w, h],
+                                     "opaque": False}
+    pygame.image.save(atlas, os.path.join(PACKED_DIR, ATLAS_FILE))
+
+    packed_files = {entry["file"] for entry in manifest["sprites"].values()}
+    packed_bytes = sum(os.path.getsize(os.path.join(PACKED_DIR, f)) for f in packed_files)
+    elapsed = time.perf_counter() - start
+    manifest["report"] = {"source_bytes": source_bytes, "packed_bytes": packed_bytes,
+                          "build_seconds": round(elapsed, 3)}
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Size/time report
+    for path, size, seconds in report:
+        print(f"{path:<24} {size / 1024:>8.0f} KB  {seconds * 1000:>6.0f} ms")
+    for name in sorted(packed_files):
+        print(f"-> {name:<21} {os.path.getsize(os.path.join(PACKED_DIR, name)) / 1024:>8.0f} KB")
+    unused = sorted(f for f in os.listdir("assets") if os.path.isfile(os.path.join("assets", f))
+                    and os.path.splitext(f)[0] not in SPRITES)
+    for name in unused:
+        print(f"skipped (unused): {name}")
+    print(f"{source_bytes / 1024:.0f} KB of sources packed into {packed_bytes / 1024:.0f} KB "
+          f"in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    pygame.init()
+    sys.exit(main())
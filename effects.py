@@ -0,0 +1,89 @@
+from array import array
+from enum import IntEnum
+
+
+class StatusEffect(IntEnum):
+    SLOW = 0
+    FREEZE = 1
+    BURN = 2
+
+
+# An affected enemy carries one flat array of [ticks left, magnitude] pairs,
+# one pair per effect kind, instead of a list of effect objects
+EFFECT_WIDTH = 2 * len(StatusEffect)
+_SLOW = 2 * StatusEffect.SLOW
+_FREEZE = 2 * StatusEffect.FREEZE
+_BURN = 2 * StatusEffect.BURN
+
+
+def new_effect_slots():
+    return array("d", bytes(8 * EFFECT_WIDTH))
+
+
+def effect_pace(slots):
+    """Speed multiplier left by the movement effects in ``slots``"""
+    if slots is None:
+        return 1.0
+    if slots[_FREEZE] > 0:
+        return 0.0
+    if slots[_SLOW] > 0:
+        return 1.0 - slots[_SLOW + 1]
+    return 1.0
+
+
+class StatusEffects:
+    """Enemies currently under an effect, ticked together once per tick.
+
+    Only affected enemies are visited, and each costs the same whether it
+    carries one effect or all of them. Slots are dropped again once every
+    effect has run out.
+    """
+
+    def __init__(self):
+        self.affected = []
+
+    def apply(self, enemy, effects):
+        """Apply ``(kind, ticks, magnitude)`` effects. Reapplying an effect
+        refreshes its duration and keeps the stronger magnitude."""
+        if not effects or not enemy.alive:
+            return
+        slots = enemy.effects
+        if slots is None:
+            slots = enemy.effects = new_effect_slots()
+            self.affected.append(enemy)
+        for kind, ticks, magnitude in effects:
+            index = 2 * kind
+            if slots[index] > 0:
+                magnitude = max(magnitude, slots[index + 1])
+            slots[index] = max(slots[index], ticks)
+            slots[index + 1] = magnitude
+        enemy.pace = effect_pace(slots)
+
+    def tick(self, game_speed):
+        """Burn, count down and refold every affected enemy's speed in one pass"""
+        still_affected = []
+        for enemy in self.affected:
+            slots = enemy.effects
+            if not enemy.alive:
+                enemy.effects = None
+                continue
+            if slots[_BURN] > 0:
+                enemy.take_damage(slots[_BURN + 1] * min(game_speed, slots[_BURN]))
+            active = False
+            for index in range(0, EFFECT_WIDTH, 2):
+                if slots[index] > 0:
+                    slots[index] = max(0.0, slots[index] - game_speed)
+                    active = active or slots[index] > 0
+            if active:
+                enemy.pace = effect_pace(slots)
+                still_affected.append(enemy)
+            else:
+                enemy.effects = None
+                enemy.pace = 1.0
+        self.affected = still_affected
+
+    def rebuild(self, enemies):
+        self.affected = [enemy for enemy in enemies if enemy.effects is not None]
+
+    def __len__(self):
+        return len(self.affected)
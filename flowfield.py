@@ -0,0 +1,207 @@
+import heapq
+from array import array
+from collections import deque
+
+UNREACHABLE = 1 << 30
+EXIT = -1  # Flow of exit cells
+
+
+class FlowField:
+    """Steps to the nearest exit from every cell of a ``cols`` x ``rows`` grid.
+
+    One breadth-first search from the exits serves every enemy at once: an
+    enemy anywhere on the grid walks to ``flow[cell]``, the neighbouring
+    cell closest to an exit, instead of searching a path of its own.
+    Blocking or freeing a cell only revisits the cells whose distance it
+    changes. Cells are ``(grid_x, grid_y)`` pairs outside this class and
+    flat indices inside it.
+    """
+
+    def __init__(self, cols, rows, cell_size):
+        self.cols = cols
+        self.rows = rows
+        self.cell_size = cell_size
+        count = cols * rows
+        self.blocked = bytearray(count)
+        self.distance = array("l", [UNREACHABLE]) * count
+        self.flow = array("l", range(count))
+        self.exits = ()
+        # Four-way neighbours of every cell, worked out once
+        self.neighbours = []
+        for index in range(count):
+            x, y = index % cols, index // cols
+            self.neighbours.append(tuple(index + offset for offset, inside in
+                                         ((-1, x > 0), (1, x < cols - 1), (-cols, y > 0), (cols, y < rows - 1))
+                                         if inside))
+
+    def _index(self, cell):
+        return cell[1] * self.cols + cell[0]
+
+    def cell_at(self, x, y):
+        """Flat index of the cell under a world position, clamped to the grid"""
+        grid_x = min(self.cols - 1, max(0, int(x // self.cell_size)))
+        grid_y = min(self.rows - 1, max(0, int(y // self.cell_size)))
+        return grid_y * self.cols + grid_x
+
+    def reset(self, exits, blocked=()):
+        """Start over with new exits and blocked cells, with one full search"""
+        self.blocked = bytearray(len(self.blocked))
+        for cell in blocked:
+            self.blocked[self._index(cell)] = 1
+        self.exits = tuple(self._index(cell) for cell in exits)
+        distance = self.distance
+        for index in range(len(distance)):
+            distance[index] = UNREACHABLE
+        queue = deque()
+        for index in self.exits:
+            if not self.blocked[index]:
+                distance[index] = 0
+                queue.append(index)
+        self._spread(queue)
+        self._update_flow(range(len(distance)))
+
+    def is_blocked(self, cell):
+        return bool(self.blocked[self._index(cell)])
+
+    def reachable(self, cell):
+        return self.distance[self._index(cell)] < UNREACHABLE
+
+    def steps_left(self, x, y):
+        """Cells between a world position and the nearest exit"""
+        return self.distance[self.cell_at(x, y)]
+
+    def next_point(self, x, y):
+        """Centre of the cell to walk to from a world position, or None at an exit"""
+        index = self.flow[self.cell_at(x, y)]
+        if index == EXIT:
+            return None
+        half = self.cell_size / 2
+        return ((index % self.cols) * self.cell_size + half, (index // self.cols) * self.cell_size + half)
+
+    def route(self, x, y):
+        """Points a walker at a world position passes on its way to the exit.
+
+        A walker heads for the centre of ``flow[cell]`` and turns as soon as
+        it crosses into that cell, so each point is where the straight line
+        to the next centre meets the shared cell edge. The last one is where
+        it enters an exit cell. Stops early in a cut-off cell.
+        """
+        index = self.cell_at(x, y)
+        cols, size, half = self.cols, self.cell_size, self.cell_size / 2
+        while True:
+            following = self.flow[index]
+            if following == EXIT or following == index:
+                return
+            target_x = (following % cols) * size + half
+            target_y = (following // cols) * size + half
+            if following % cols != index % cols:
+                edge = max(index, following) % cols * size
+                fraction = (edge - x) / (target_x - x)
+            else:
+                edge = max(index, following) // cols * size
+                fraction = (edge - y) / (target_y - y)
+            x, y = x + fraction * (target_x - x), y + fraction * (target_y - y)
+            yield x, y
+            index = following
+
+    def try_block(self, cell, required):
+        """Block ``cell`` unless that cuts one of the ``required`` cells off
+        from every exit. Returns whether the cell was blocked."""
+        if self.is_blocked(cell):
+            return False
+        self.block(cell)
+        if all(self.reachable(other) for other in required):
+            return True
+        self.unblock(cell)
+        return False
+
+    def block(self, cell):
+        index = self._index(cell)
+        self.blocked[index] = 1
+        distance = self.distance
+        if distance[index] == UNREACHABLE:
+            return
+        # Cells that lose every shortest route through the blocked cell, found
+        # level by level: one is cut off when no unaffected neighbour is one
+        # step closer to an exit
+        affected = {index}
+        queue = deque([index])
+        while queue:
+            current = queue.popleft()
+            for neighbour in self.neighbours[current]:
+                level = distance[neighbour]
+                if (level != distance[current] + 1 or neighbour in affected or self.blocked[neighbour]
+                        or any(distance[other] == level - 1 and other not in affected and not self.blocked[other]
+                               for other in self.neighbours[neighbour])):
+                    continue
+                affected.add(neighbour)
+                queue.append(neighbour)
+        for cell_index in affected:
+            distance[cell_index] = UNREACHABLE
+        # Refill the affected cells from the unaffected cells around them
+        heap = []
+        for cell_index in affected:
+            if self.blocked[cell_index]:
+                continue
+            best = min((distance[other] for other in self.neighbours[cell_index]), default=UNREACHABLE)
+            if best < UNREACHABLE:
+                heap.append((best + 1, cell_index))
+        heapq.heapify(heap)
+        while heap:
+            level, cell_index = heapq.heappop(heap)
+            if level >= distance[cell_index]:
+                continue
+            distance[cell_index] = level
+            for neighbour in self.neighbours[cell_index]:
+                if level + 1 < distance[neighbour] and not self.blocked[neighbour]:
+                    heapq.heappush(heap, (level + 1, neighbour))
+        self._update_flow(self._around(affected))
+
+    def unblock(self, cell):
+        index = self._index(cell)
+        if not self.blocked[index]:
+            return
+        self.blocked[index] = 0
+        distance = self.distance
+        if index in self.exits:
+            distance[index] = 0
+        else:
+            distance[index] = min(min(distance[other] for other in self.neighbours[index]) + 1, UNREACHABLE)
+        if distance[index] == UNREACHABLE:
+            return
+        # Only cells that get closer to an exit through the freed cell change
+        changed = self._spread(deque([index]))
+        changed.add(index)
+        self._update_flow(self._around(changed))
+
+    def _spread(self, queue):
+        """Breadth-first relaxation from the cells in ``queue``; returns the cells it lowered"""
+        distance, blocked, neighbours = self.distance, self.blocked, self.neighbours
+        changed = set()
+        while queue:
+            current = queue.popleft()
+            level = distance[current] + 1
+            for neighbour in neighbours[current]:
+                if level < distance[neighbour] and not blocked[neighbour]:
+                    distance[neighbour] = level
+                    changed.add(neighbour)
+                    queue.append(neighbour)
+        return changed
+
+    def _around(self, cells):
+        """``cells`` and their neighbours, whose flow may point at them"""
+        around = set(cells)
+        for index in cells:
+            around.update(self.neighbours[index])
+        return around
+
+    def _update_flow(self, cells):
+        distance, neighbours, flow = self.distance, self.neighbours, self.flow
+        for index in cells:
+            if distance[index] == 0:
+                flow[index] = EXIT
+                continue
+            # Blocked or cut-off cells still point to their best neighbour, so
+            # an enemy caught in one walks out
+            best = min(neighbours[index], key=distance.__getitem__)
+            flow[index] = best if distance[best] < UNREACHABLE else index
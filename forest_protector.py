@@ -1,11 +1,33 @@
 import asyncio
+import copy
+import itertools
 import pygame
 import math
 import random
+import sys
 import time
 import os
+from collections import namedtuple
 from enum import Enum
-# Initialize Pygame
+
+from assets import convert_all, decode_all, load_image, load_source
+from audio import SoundPool
+from effects import StatusEffect, StatusEffects, effect_pace
+from flowfield import FlowField
+from savestate import (AutosaveWriter, SnapshotError, SnapshotReader, SnapshotWriter,
+                       pack_rng_state, unpack_rng_state)
+from rewind import RewindBuffer
+from separation import Separation
+from scheduler import EventQueue, SpawnQueue
+from simthread import SimulationThread
+from targeting import PRIORITY_SCORES, FieldIndex, LaneIndex, TargetPriority, coverage_intervals
+from viewport import AutoRenderScale, ChunkCache, LevelOfDetail, Minimap, SpriteBatch, SpriteCache, Viewport
+# Batch mode: simulate the saved game without a window (python forest_protector.py --headless)
+HEADLESS = "--headless" in sys.argv
+if HEADLESS:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+# Initialize Pygame; a small mixer buffer keeps shots in step with the picture
+pygame.mixer.pre_init(22050, -16, 1, 512)
 pygame.init()
 # Constants
 SCREEN_WIDTH = 1920
@@ -13,6 +35,17 @@ SCREEN_HEIGHT = 1080
 FPS = 60
 PANEL_WIDTH = 300  # Width of the side panel
 GAME_FIELD_WIDTH = SCREEN_WIDTH - PANEL_WIDTH  # Width of the game field
+
+# Maps can be several screens wide and scroll with WASD or the left/right keys (python main.py --wide)
+MAP_SCREENS = 3 if "--wide" in sys.argv else 1
+WORLD_WIDTH = GAME_FIELD_WIDTH * MAP_SCREENS
+WORLD_HEIGHT = SCREEN_HEIGHT
+CAMERA_SPEED = 900  # Screen pixels per second
+BACKGROUND_CHUNK_SIZE = 512  # World pixels per side of a cached background chunk
+BACKGROUND_CACHE_PIXELS = 12_000_000  # Chunks kept (~48 MB) before the least recently drawn out of view go
+CULL_MARGIN = 80  # Entities this far outside the view are still drawn, for sprites and bars that reach in
+MINIMAP_AREA = (GAME_FIELD_WIDTH + 20, 620, 260, 90)  # Side panel space the minimap is fitted into
+MINIMAP_REFRESH_FRAMES = 6  # Frames between redraws of the minimap dots
 # Colors
 GREEN = (34, 139, 34)
 DARK_GREEN = (0, 100, 0)
@@ -32,9 +65,59 @@ GOLD = (255, 215, 0)
 DARK_BROWN = (101, 67, 33)
 # Game settings
 GRID_SIZE = 20
-GRID_COLS = GAME_FIELD_WIDTH // GRID_SIZE
-GRID_ROWS = SCREEN_HEIGHT // GRID_SIZE
+GRID_COLS = WORLD_WIDTH // GRID_SIZE
+GRID_ROWS = WORLD_HEIGHT // GRID_SIZE
 PATH_WIDTH = 60
+LANE_GAP = 120  # Distance between the centre lines of side-by-side lanes
+# Enemies closer than this steer sideways, up to the offset from the centre line, so waves spread over the road
+SEPARATION_RADIUS = 30
+SEPARATION_MAX_OFFSET = PATH_WIDTH // 2 - 6
+SEPARATION_SPEED = 0.6  # Sideways pixels per tick
+SEPARATION_INTERVAL = 3  # Ticks between separation passes, each moving the offsets that many ticks' worth
+
+# Render settings
+RENDER_SCALES = (0.5, 0.75, 1.0)  # Internal resolutions of the game field
+RENDER_SCALE = 1.0
+AUTO_RENDER_SCALE = True  # Lower the render scale while frames run over budget
+ZOOM_LEVELS = (1.0, 1.5, 2.0)  # Mouse wheel or Q/E, around the cursor or the view centre
+SPRITE_CACHE_PIXELS = 12_000_000  # Scaled sprite variants kept (~48 MB) before the least recently used go
+
+# Sound effects: copies of each that may play at once, shortest gap in seconds
+# between two starts, and the tone (frequency, seconds, pitch sweep, noise)
+# synthesized when assets/sounds has no file of that name
+AUDIO_CHANNELS = 8
+SOUND_SETTINGS = {
+    "archer_shot": {"voices": 2, "cooldown": 0.06, "volume": 0.25, "tone": (1400, 0.05, 0.6, 0.3)},
+    "cannon_shot": {"voices": 2, "cooldown": 0.15, "volume": 0.5, "tone": (90, 0.25, 0.5, 0.6)},
+    "magic_shot": {"voices": 2, "cooldown": 0.1, "volume": 0.3, "tone": (600, 0.15, 2.0, 0.0)},
+    "enemy_death": {"voices": 3, "cooldown": 0.05, "volume": 0.35, "tone": (320, 0.12, 0.4, 0.2)},
+    "life_lost": {"voices": 1, "cooldown": 0.3, "volume": 0.6, "tone": (220, 0.4, 0.5, 0.0)},
+}
+
+# Draw order of the batched world sprites
+LAYER_TOWERS, LAYER_PROJECTILES, LAYER_ENEMIES, LAYER_HEALTH_BARS = range(4)
+
+# Level of detail: entities on the field at which detail drops a level, and the
+# frame time that drops one more (F3 shows the current level)
+LOD_ENTITY_THRESHOLDS = (150, 400)
+LOD_FRAME_BUDGET = 1 / FPS
+
+# Desktop only: run the simulation on its own thread (python main.py --threaded)
+THREADED_SIMULATION = "--threaded" in sys.argv and sys.platform != "emscripten"
+
+# Stress test: waves keep growing and the game never ends (python main.py --endless)
+ENDLESS = "--endless" in sys.argv
+
+# Maze mode: towers go anywhere on the grid and enemies route around them (python main.py --maze)
+MAZE_MODE = "--maze" in sys.argv
+ENEMY_BUCKET_SIZE = 64  # World pixels per side of the position buckets maze targeting searches
+
+# Immutable per-frame copies of the simulation state that the render loop draws from
+TowerSnapshot = namedtuple("TowerSnapshot", "type x y level max_level selected range color image priority")
+EnemySnapshot = namedtuple("EnemySnapshot", "type x y health max_health size color image")
+ProjectileSnapshot = namedtuple("ProjectileSnapshot", "x y color")
+FrameSnapshot = namedtuple("FrameSnapshot", "towers enemies projectiles lanes game_state score money "
+                                            "lives wave path_index wave_cleared")
 # Button class for UI elements
 class Button:
     def __init__(self, x, y, width, height, text, color, text_color=WHITE):
@@ -78,6 +161,10 @@ TOWER_SETTINGS = {
         "accuracy": 1,
         "color": ARCHER_GREEN,
         "projectile_speed": 8,
+        "shot_sound": "archer_shot",
+        "splash_radius": 0,
+        "effects": (),
+        "max_level_effects": (),
         "max_level": 5  # Maximum upgrade level
     },
     TowerType.CANNON: {
@@ -88,6 +175,10 @@ TOWER_SETTINGS = {
         "accuracy": 0.65,
         "color": CANNON_GRAY,
         "projectile_speed": 5,
+        "shot_sound": "cannon_shot",
+        "splash_radius": 40,  # Shells hurt every enemy this far along the path from the impact
+        "effects": (),
+        "max_level_effects": (),
         "max_level": 3  # Maximum upgrade level
     },
     TowerType.MAGIC: {
@@ -98,6 +189,12 @@ TOWER_SETTINGS = {
         "accuracy": 0.95,
         "color": MAGIC_PURPLE,
         "projectile_speed": 10,
+        "shot_sound": "magic_shot",
+        "splash_radius": 0,
+        # (effect, ticks, magnitude): slows by 40% and burns 0.1 health per tick
+        "effects": ((StatusEffect.SLOW, 90, 0.4), (StatusEffect.BURN, 120, 0.1)),
+        # Fully upgraded, the slow becomes a short freeze
+        "max_level_effects": ((StatusEffect.FREEZE, 30, 1.0), (StatusEffect.BURN, 120, 0.1)),
         "max_level": 2  # Maximum upgrade level
     }
 }
@@ -125,11 +222,78 @@ ENEMY_TYPES = {
         "color": (50, 25, 25)
     }
 }
+# Sprite sizes
+TOWER_SPRITE_SIZE = (48, 72)
+
+# Every sprite the game draws as (name, size, opaque), decoded together at startup
+ASSET_SPECS = (
+    [(tower_type.name.lower(), TOWER_SPRITE_SIZE, False) for tower_type in TowerType]
+    + [(name, (props["size"] * 2, props["size"] * 2), False) for name, props in ENEMY_TYPES.items()]
+    + [("grass", (GAME_FIELD_WIDTH, SCREEN_HEIGHT), True), ("road", (PATH_WIDTH, PATH_WIDTH), True)]
+)
+
+# Read-only per-type data shared by every entity of that type
+TowerStats = namedtuple("TowerStats", "cost damage range fire_rate accuracy color projectile_speed shot_sound "
+                                       "splash_radius effects max_level_effects max_level image")
+EnemyStats = namedtuple("EnemyStats", "health speed reward size color image")
+_tower_stats = {}
+_enemy_stats = {}
+
+def get_tower_stats(tower_type):
+    # Built on first use, once the display exists to convert the sprite
+    if tower_type not in _tower_stats:
+        try:
+            # Pre-scaled sprite from the packed assets when available
+            image = load_image(tower_type.name.lower(), TOWER_SPRITE_SIZE)
+        except Exception as e:
+            print(f"Could not load tower image: {e}")
+            image = None
+        _tower_stats[tower_type] = TowerStats(image=image, **TOWER_SETTINGS[tower_type])
+    return _tower_stats[tower_type]
+
+def get_enemy_stats(enemy_type, difficulty):
+    # Difficulty multipliers are applied here so enemies don't redo them
+    key = (enemy_type, difficulty)
+    if key not in _enemy_stats:
+        properties = ENEMY_TYPES[enemy_type]
+        difficulty_settings = DIFFICULTY_SETTINGS[difficulty]
+        try:
+            size = properties["size"] * 2
+            image = load_image(enemy_type, (size, size))
+        except Exception:
+            image = None
+        _enemy_stats[key] = EnemyStats(properties["health"] * difficulty_settings["enemy_health_multiplier"],
+                                       properties["speed"] * difficulty_settings["enemy_speed_multiplier"],
+                                       properties["reward"] * difficulty_settings["enemy_reward_multiplier"],
+                                       properties["size"], properties["color"], image)
+    return _enemy_stats[key]
+
+# Projectile settings
+PROJECTILE_HIT_RADIUS = 5  # Distance at which a projectile hits its target
+
+# Targeting settings
+RETARGET_BUDGET = 8  # Full enemy scans per tick, shared round-robin by ready towers without a target
+
 # Wave settings
-WAVE_DELAY = 3  # Seconds between waves
+WAVE_DELAY = 3  # Simulated seconds between waves
 ENEMIES_PER_WAVE = 5
 WAVE_BONUS = 500
 GAME_TIME_LIMIT = 300  # 5 minutes in seconds
+HEADLESS_TICKS = GAME_TIME_LIMIT * FPS  # Longest headless run, one full game at 60 FPS
+SPAWN_RATE = 100  # Most enemies released per simulated second; only big waves take longer than 1 s
+ENDLESS_COUNT_GROWTH = 1.25  # Endless wave size multiplier per wave (1000+ enemies by wave 25)
+ENDLESS_HEALTH_GROWTH = 1.08  # Endless enemy health multiplier per wave after wave 10
+# Save settings
+SAVE_FILE = "savegame.fps"
+AUTOSAVE_INTERVAL = 30  # Seconds between autosaves
+GAME_STATES = ("playing", "paused", "game_over", "victory")  # Order used by save files
+ENEMY_TYPE_NAMES = list(ENEMY_TYPES)
+
+# Rewind settings
+REWIND_INTERVAL = 1.0  # Simulated seconds between rewind snapshots
+REWIND_HISTORY = 300  # Snapshots kept (5 minutes of play)
+REWIND_MEMORY_LIMIT = 4 * 1024 * 1024  # Bytes
+
 # Difficulty settings
 DIFFICULTY_SETTINGS = {
     1: {  # Easy
@@ -179,153 +343,279 @@ DIFFICULTY_SETTINGS = {
     }
 }
 class Projectile:
-    def __init__(self, x, y, target, damage, projectile_speed, color):
+    __slots__ = ("x", "y", "target", "damage", "speed", "color", "splash", "effects", "active")
+    
+    def __init__(self, x, y, target, damage, projectile_speed, color, splash=0, effects=()):
         self.x = x
         self.y = y
         self.target = target
         self.damage = damage
         self.speed = projectile_speed
         self.color = color
+        self.splash = splash  # Blast radius; splash damage is left to the game
+        self.effects = effects  # Status effects for the game to apply on hit
         self.active = True
         
     def update(self, game_speed):
+        """Move one tick. Returns True when the projectile lands."""
         if not self.target.alive:
             self.active = False
-            return
+            return False
             
         # Calculate direction to target
         dx = self.target.x - self.x
         dy = self.target.y - self.y
         distance = math.sqrt(dx**2 + dy**2)
         
-        if distance < 5:  # Hit the target
-            self.target.take_damage(self.damage)
+        if distance < PROJECTILE_HIT_RADIUS:  # Hit the target
+            if not self.splash:
+                self.target.take_damage(self.damage)
             self.active = False
-        else:
-            # Move towards target
-            dx /= distance
-            dy /= distance
-            self.x += dx * self.speed * game_speed
-            self.y += dy * self.speed * game_speed
+            return True
+        
+        # Move towards target
+        dx /= distance
+        dy /= distance
+        self.x += dx * self.speed * game_speed
+        self.y += dy * self.speed * game_speed
+        return False
     
-    def draw(self, screen):
-        if self.active:
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), 2)
+    def time_to_impact(self, field=None):
+        """Simulated seconds until this projectile reaches its target, or None if
+        the target leaves the path first.
+        
+        Walks the target's remaining route (the flow field's, in maze mode) and
+        solves, per segment, for the first moment the target is within reach of
+        a straight shot from here.
+        """
+        enemy = self.target
+        reach = self.speed * FPS  # Pixels per simulated second
+        enemy_speed = enemy.speed * enemy.pace * FPS
+        ex, ey = enemy.x, enemy.y
+        elapsed = 0.0
+        for next_x, next_y in enemy.route(field):
+            length = math.hypot(next_x - ex, next_y - ey)
+            duration = length / enemy_speed if enemy_speed > 0 else float("inf")
+            vx = (next_x - ex) / duration if length and enemy_speed > 0 else 0
+            vy = (next_y - ey) / duration if length and enemy_speed > 0 else 0
+            
+            # |offset + v*t| = reach * (elapsed + t) + radius, as a*t^2 + b*t + c = 0
+            ox, oy = ex - self.x, ey - self.y
+            covered = reach * elapsed + PROJECTILE_HIT_RADIUS
+            a = vx * vx + vy * vy - reach * reach
+            b = 2 * (ox * vx + oy * vy - reach * covered)
+            c = ox * ox + oy * oy - covered * covered
+            if c <= 0:
+                return elapsed
+            if a == 0:
+                roots = [-c / b] if b else []
+            else:
+                discriminant = b * b - 4 * a * c
+                if discriminant < 0:
+                    roots = []
+                else:
+                    # The cancellation-free form, exact even when the target
+                    # moves at nearly the projectile's speed and a is tiny
+                    q = -(b + math.copysign(math.sqrt(discriminant), b)) / 2
+                    roots = [q / a, c / q] if q else []
+            hits = [t for t in roots if 0 <= t <= duration]
+            if hits:
+                return elapsed + min(hits)
+            if duration == float("inf"):
+                return None
+            ex, ey = next_x, next_y
+            elapsed += duration
+        return None
+    
+    def snapshot(self):
+        return ProjectileSnapshot(self.x, self.y, self.color)
+    
+    @staticmethod
+    def draw(batch, view, state):
+        dot = view.circle(state.color, 2)
+        batch.add(LAYER_PROJECTILES, dot, dot.get_rect(center=view.to_screen(state.x, state.y)))
+    
+    @staticmethod
+    def draw_merged(batch, view, states):
+        # Low detail: projectiles sharing a 4 pixel cell become one opaque square
+        cells = set()
+        for state in states:
+            x, y = view.to_screen(state.x, state.y)
+            cells.add((int(x) // 4 * 4, int(y) // 4 * 4, state.color))
+        for x, y, color in cells:
+            batch.add(LAYER_PROJECTILES, view.fill(color, (3, 3)), (x, y))
+    
+    def pack_state(self, writer, target_id):
+        writer.pack("ddddI", self.x, self.y, self.damage, self.speed, target_id)
+    
+    @classmethod
+    def unpack_state(cls, reader, targets, color, splash, effects):
+        x, y, damage, speed, target_id = reader.unpack("ddddI")
+        return cls(x, y, targets[target_id], damage, speed, color, splash, effects)
 class Tower:
+    __slots__ = ("x", "y", "type", "stats", "damage", "range", "fire_rate", "accuracy", "ready_time",
+                 "level", "target", "priority", "selected", "projectiles", "total_cost", "difficulty",
+                 "upgrade_effectiveness", "coverage", "coverage_lanes", "coverage_range")
+    
     def __init__(self, x, y, tower_type, difficulty=1):
         self.x = x
         self.y = y
         self.type = tower_type
-        self.settings = TOWER_SETTINGS[tower_type]
-        self.damage = self.settings["damage"]
-        self.range = self.settings["range"]
-        self.fire_rate = self.settings["fire_rate"]
-        self.accuracy = self.settings["accuracy"]
-        self.last_shot = 0
+        self.stats = get_tower_stats(tower_type)  # Shared base stats and sprite
+        self.damage = self.stats.damage
+        self.range = self.stats.range
+        self.fire_rate = self.stats.fire_rate
+        self.accuracy = self.stats.accuracy
+        self.ready_time = 0  # Simulation time the tower can fire again
         self.level = 1
         self.target = None
+        self.priority = TargetPriority.NEAREST  # Cycled with a right click
         self.selected = False
         self.projectiles = []
-        self.projectile_speed = self.settings["projectile_speed"]
-        self.color = self.settings["color"]
-        self.total_cost = self.settings["cost"]  # Track total cost for refunds
-        self.max_level = self.settings["max_level"]  # Maximum upgrade level
+        self.total_cost = self.stats.cost  # Track total cost for refunds
         self.difficulty = difficulty
         self.upgrade_effectiveness = DIFFICULTY_SETTINGS[difficulty]["tower_upgrade_effectiveness"]
         
-        # Load tower image
-        self.use_image = False
-        try:
-            # Construct image path based on tower type
-            image_path = f"assets/{tower_type.name.lower()}.png"
-            self.image = pygame.image.load(image_path).convert_alpha()
-            # Scale image to appropriate size (40x40 pixels)
-            self.image = pygame.transform.scale(self.image, (48 , 72))
-            self.use_image = True
-            print(f"Loaded tower image: {image_path}")
-        except pygame.error as e:
-            print(f"Could not load tower image {image_path}: {e}")
-            self.use_image = False
-        except Exception as e:
-            print(f"Error loading tower image: {e}")
-            self.use_image = False
-        
-    def update(self, enemies, current_time, game_speed):
-        # Update projectiles
+        # Arc-length intervals of each lane inside the range circle
+        self.coverage = ()
+        self.coverage_lanes = None
+        self.coverage_range = None
+        
+    def update_coverage(self, enemy_index):
+        if isinstance(enemy_index, FieldIndex):
+            return  # Maze mode has no path to cover, ranges are checked directly
+        # Only recomputed when the map changes or an upgrade grows the range
+        if self.coverage_lanes is not enemy_index.paths or self.coverage_range != self.range:
+            self.coverage = tuple(coverage_intervals(lane.path, lane.offsets, self.x, self.y, self.range)
+                                  for lane in enemy_index.lanes)
+            self.coverage_lanes = enemy_index.paths
+            self.coverage_range = self.range
+    
+    def covers(self, lane, arc):
+        for start, end in self.coverage[lane]:
+            if start <= arc <= end:
+                return True
+        return False
+    
+    def in_range(self, enemy, enemy_index):
+        if isinstance(enemy_index, FieldIndex):
+            return (enemy.x - self.x)**2 + (enemy.y - self.y)**2 <= self.range**2
+        return self.covers(enemy.lane, enemy_index.arc(enemy))
+    
+    def find_target(self, enemy_index):
+        if isinstance(enemy_index, FieldIndex):
+            return enemy_index.find_target(self.x, self.y, self.range, self.priority)
+        lanes = zip(enemy_index.lanes, self.coverage)
+        if self.priority in (TargetPriority.FIRST, TargetPriority.LAST):
+            # One candidate per lane; lanes differ in length, so they are
+            # compared by the distance each candidate has left to the exit
+            first = self.priority is TargetPriority.FIRST
+            candidates = []
+            for lane, coverage in lanes:
+                enemy = lane.first_in(coverage) if first else lane.last_in(coverage)
+                if enemy is not None:
+                    candidates.append((lane.length - lane.arc(enemy), enemy))
+            if not candidates:
+                return None
+            return (min if first else max)(candidates, key=lambda candidate: candidate[0])[1]
+        
+        # Otherwise the best scoring of the live enemies inside the covered intervals
+        if self.priority is TargetPriority.NEAREST:
+            score = lambda enemy: -((enemy.x - self.x)**2 + (enemy.y - self.y)**2)
+        else:
+            score = PRIORITY_SCORES[self.priority]
+        in_range = (enemy for lane, coverage in lanes for enemy in lane.live_in(coverage))
+        return max(in_range, key=score, default=None)
+    
+    @property
+    def effects(self):
+        if self.level >= self.stats.max_level:
+            return self.stats.max_level_effects
+        return self.stats.effects
+    
+    def update_projectiles(self, game_speed, landed):
+        # Hits with splash or status effects are collected for the game to resolve in one batch
         for projectile in self.projectiles[:]:
-            projectile.update(game_speed)
+            if projectile.update(game_speed) and (projectile.splash or projectile.effects):
+                landed.append(projectile)
             if not projectile.active:
                 self.projectiles.remove(projectile)
-        
-        # Find target
-        self.target = None
-        min_distance = float('inf')
-        
-        for enemy in enemies:
-            distance = math.sqrt((enemy.x - self.x)**2 + (enemy.y - self.y)**2)
-            if distance < self.range and distance < min_distance:
-                min_distance = distance
-                self.target = enemy
-        
-        # Shoot at target
-        if self.target and current_time - self.last_shot > 1 / (self.fire_rate * game_speed):
-            self.last_shot = current_time
-            
-            # Check if shot hits based on accuracy
-            if random.random() < self.accuracy:
-                # For magic tower, predict enemy position
-                if self.type == TowerType.MAGIC:
-                    # Calculate time to reach enemy
-                    distance = math.sqrt((self.target.x - self.x)**2 + (self.target.y - self.y)**2)
-                    time_to_hit = distance / (self.projectile_speed * game_speed)
+    
+    def retarget(self, enemy_index, can_scan=True):
+        """Keep the current target until it dies or leaves range; only then look
+        for a new one, if this tick's scan budget allows. Returns True if it scanned.
+        """
+        self.update_coverage(enemy_index)
+        if self.target and not (self.target.alive and self.in_range(self.target, enemy_index)):
+            self.target = None
+        if self.target is None and enemy_index and can_scan:
+            self.target = self.find_target(enemy_index)
+            return True
+        return False
+    
+    def fire(self, sim_time, game_speed):
+        """Start reloading and return the projectile fired, or None on a miss"""
+        # Reloads run on the simulation clock, so speed changes apply mid-cooldown too
+        self.ready_time = sim_time + 1 / self.fire_rate
+        
+        # Check if shot hits based on accuracy
+        if random.random() < self.accuracy:
+            # For magic tower, predict enemy position
+            if self.type == TowerType.MAGIC:
+                # Calculate time to reach enemy
+                distance = math.sqrt((self.target.x - self.x)**2 + (self.target.y - self.y)**2)
+                time_to_hit = distance / (self.stats.projectile_speed * game_speed)
+                
+                # Predict enemy position
+                predicted_x = self.target.x
+                predicted_y = self.target.y
+                
+                # Get current and next waypoints; maze enemies have none to follow
+                if self.target.path_index < len(self.target.path) - 1 and not MAZE_MODE:
+                    current = self.target.path[self.target.path_index]
+                    next_point = self.target.path[self.target.path_index + 1]
                     
-                    # Predict enemy position
-                    predicted_x = self.target.x
-                    predicted_y = self.target.y
+                    # Calculate direction
+                    dx = next_point[0] - current[0]
+                    dy = next_point[1] - current[1]
+                    path_distance = math.sqrt(dx**2 + dy**2)
                     
-                    # Get current and next waypoints
-                    if self.target.path_index < len(self.target.path) - 1:
-                        current = self.target.path[self.target.path_index]
-                        next_point = self.target.path[self.target.path_index + 1]
-                        
-                        # Calculate direction
-                        dx = next_point[0] - current[0]
-                        dy = next_point[1] - current[1]
-                        path_distance = math.sqrt(dx**2 + dy**2)
+                    if path_distance > 0:
+                        dx /= path_distance
+                        dy /= path_distance
                         
-                        if path_distance > 0:
-                            dx /= path_distance
-                            dy /= path_distance
-                            
-                            # Predict position
-                            predicted_x = self.target.x + dx * self.target.speed * game_speed * time_to_hit
-                            predicted_y = self.target.y + dy * self.target.speed * game_speed * time_to_hit
-                    
-                    # Create projectile with predicted position
-                    projectile = Projectile(self.x, self.y, self.target, self.damage, 
-                                          self.projectile_speed, self.color)
-                    projectile.target.x = predicted_x
-                    projectile.target.y = predicted_y
-                    self.projectiles.append(projectile)
-                else:
-                    # For other towers, aim directly at enemy
-                    projectile = Projectile(self.x, self.y, self.target, self.damage, 
-                                          self.projectile_speed, self.color)
-                    self.projectiles.append(projectile)
+                        # Predict position
+                        speed = self.target.speed * self.target.pace
+                        predicted_x = self.target.x + dx * speed * game_speed * time_to_hit
+                        predicted_y = self.target.y + dy * speed * game_speed * time_to_hit
+                
+                # Create projectile with predicted position
+                projectile = Projectile(self.x, self.y, self.target, self.damage, 
+                                      self.stats.projectile_speed, self.stats.color, self.stats.splash_radius,
+                                      self.effects)
+                projectile.target.x = predicted_x
+                projectile.target.y = predicted_y
+                return projectile
+            else:
+                # For other towers, aim directly at enemy
+                return Projectile(self.x, self.y, self.target, self.damage, 
+                                  self.stats.projectile_speed, self.stats.color, self.stats.splash_radius,
+                                  self.effects)
+        return None
     
     def upgrade(self):
         # Check if tower can be upgraded further
-        if self.level >= self.max_level:
+        if self.level >= self.stats.max_level:
             return False  # Cannot upgrade
         
-        upgrade_cost = int(TOWER_SETTINGS[self.type]["cost"] * 0.75)
+        upgrade_cost = int(self.stats.cost * 0.75)
         self.total_cost += upgrade_cost
         self.level += 1
         
         # Apply upgrade effectiveness based on difficulty
-        damage_increase = self.settings["damage"] * 0.15 * self.upgrade_effectiveness
-        range_increase = self.settings["range"] * 0.1 * self.upgrade_effectiveness
-        fire_rate_increase = self.settings["fire_rate"] * 0.05 * self.upgrade_effectiveness
+        damage_increase = self.stats.damage * 0.15 * self.upgrade_effectiveness
+        range_increase = self.stats.range * 0.1 * self.upgrade_effectiveness
+        fire_rate_increase = self.stats.fire_rate * 0.05 * self.upgrade_effectiveness
         accuracy_increase = 0.02 * self.upgrade_effectiveness
         
         self.damage += damage_increase
@@ -333,66 +623,89 @@ class Tower:
         self.fire_rate += fire_rate_increase
         self.accuracy = min(1.0, self.accuracy + accuracy_increase)
         return True  # Upgrade successful
-        
-    def draw(self, screen):
+    
+    def pack_state(self, writer, sim_time, enemy_ids):
+        # The sticky target as an enemy index, -1 for none or one that is already gone
+        target_id = enemy_ids.get(id(self.target), -1)
+        writer.pack("BBddBddddddI?Bi", self.type.value, self.difficulty, self.x, self.y, self.level,
+                    self.damage, self.range, self.fire_rate, self.accuracy, self.upgrade_effectiveness,
+                    max(0, self.ready_time - sim_time), self.total_cost, self.selected, self.priority.value,
+                    target_id)
+        # Projectiles whose target is already gone would be dropped next frame anyway
+        projectiles = [p for p in self.projectiles if p.active and id(p.target) in enemy_ids]
+        writer.pack("I", len(projectiles))
+        for projectile in projectiles:
+            projectile.pack_state(writer, enemy_ids[id(projectile.target)])
+    
+    def unpack_state(self, reader, sim_time, enemies):
+        (self.difficulty, self.x, self.y, self.level, self.damage, self.range, self.fire_rate,
+         self.accuracy, self.upgrade_effectiveness, reload_left, self.total_cost,
+         self.selected, priority, target_id) = reader.unpack("BddBddddddI?Bi")
+        self.ready_time = sim_time + reload_left
+        self.priority = TargetPriority(priority)
+        self.target = enemies[target_id] if target_id >= 0 else None
+        num_projectiles, = reader.unpack("I")
+        self.projectiles = [Projectile.unpack_state(reader, enemies, self.stats.color, self.stats.splash_radius,
+                                                    self.effects)
+                            for _ in range(num_projectiles)]
+        
+    def snapshot(self):
+        return TowerSnapshot(self.type, self.x, self.y, self.level, self.stats.max_level, self.selected,
+                             self.range, self.stats.color, self.stats.image, self.priority)
+    
+    @staticmethod
+    def draw(batch, view, state, detail=LevelOfDetail.FULL):
+        pos = view.to_screen(state.x, state.y)
+        # Level labels are only kept for the selected tower once detail drops
+        show_level = detail == LevelOfDetail.FULL or state.selected
         # Only draw if image is available
-        if self.use_image:
-            # Draw tower image
-            rect = self.image.get_rect(center=(self.x, self.y))
-            screen.blit(self.image, rect)
+        if state.image:
+            # Draw tower image, cached under its sprite name so zoomed variants scale from the source PNG
+            image = view.sprite(state.type.name.lower(), state.image)
+            batch.add(LAYER_TOWERS, image, image.get_rect(center=pos))
             
             # Draw tower level indicator
-            font = pygame.font.SysFont(None, 20)
-            level_text = font.render(f"{self.level}/{self.max_level}", True, WHITE)
-            screen.blit(level_text, (self.x - 10, self.y + 10))
+            if show_level:
+                level_text = view.text(f"{state.level}/{state.max_level}", 20, WHITE)
+                batch.add(LAYER_TOWERS, level_text, view.to_screen(state.x - 10, state.y + 10))
+                
+                # Draw target priority when it isn't the default
+                if state.priority is not TargetPriority.NEAREST:
+                    priority_text = view.text(state.priority.label, 18, LIGHT_GRAY)
+                    batch.add(LAYER_TOWERS, priority_text, view.to_screen(state.x - 15, state.y + 24))
             
             # Draw range indicator when selected
-            if self.selected:
-                pygame.draw.circle(screen, (100, 100, 255, 50), (self.x, self.y), self.range, 1)
+            if state.selected:
+                ring = view.circle((100, 100, 255), state.range, 1)
+                batch.add(LAYER_TOWERS, ring, ring.get_rect(center=pos))
                 
                 # Draw upgrade status
-                if self.level < self.max_level:
-                    upgrade_text = font.render(f"Upgrade: ${TOWER_SETTINGS[self.type]['cost'] // 2}", True, YELLOW)
+                if state.level < state.max_level:
+                    upgrade_text = view.text(f"Upgrade: ${TOWER_SETTINGS[state.type]['cost'] // 2}", 20, YELLOW)
                 else:
-                    upgrade_text = font.render("MAX LEVEL", True, RED)
-                screen.blit(upgrade_text, (self.x - 40, self.y + 25))
-        
-        # Draw projectiles regardless of image availability
-        for projectile in self.projectiles:
-            projectile.draw(screen)
+                    upgrade_text = view.text("MAX LEVEL", 20, RED)
+                batch.add(LAYER_TOWERS, upgrade_text, view.to_screen(state.x - 40, state.y + 25))
 class Enemy:
-    def __init__(self, path, enemy_type="goblin", difficulty=1):
+    __slots__ = ("path", "path_index", "x", "y", "type", "stats", "health", "max_health", "speed",
+                 "pace", "effects", "reward", "alive", "progress", "lane", "offset")
+    
+    def __init__(self, path, enemy_type="goblin", difficulty=1, lane=0):
         self.path = path
+        self.lane = lane  # Index of ``path`` among the map's lanes
         self.path_index = 0
         self.x = path[0][0]
         self.y = path[0][1]
         self.type = enemy_type
-        self.properties = ENEMY_TYPES[enemy_type]
-        
-        # Apply difficulty multipliers
-        difficulty_settings = DIFFICULTY_SETTINGS[difficulty]
-        health_multiplier = difficulty_settings["enemy_health_multiplier"]
-        speed_multiplier = difficulty_settings["enemy_speed_multiplier"]
-        reward_multiplier = difficulty_settings["enemy_reward_multiplier"]
-        
-        self.health = self.properties["health"] * health_multiplier
+        self.stats = get_enemy_stats(enemy_type, difficulty)  # Shared, difficulty already applied
+        self.health = self.stats.health
         self.max_health = self.health
-        self.speed = self.properties["speed"] * speed_multiplier
-        self.reward = self.properties["reward"] * reward_multiplier
+        self.speed = self.stats.speed
+        self.pace = 1.0  # Speed multiplier from slow and freeze
+        self.effects = None  # Status effect slots, only while affected
+        self.reward = self.stats.reward
         self.alive = True
         self.progress = 0  # Progress along current path segment
-        self.spawn_delay = random.uniform(0, 1)
-        
-        # Load enemy image
-        self.use_image = False
-        try:
-            self.image = pygame.image.load(f"assets/{enemy_type}.png").convert_alpha()
-            # Scale image to appropriate size
-            size = self.properties["size"] * 2
-            self.image = pygame.transform.scale(self.image, (size, size))
-            self.use_image = True
-        except Exception:
-            self.use_image = False
+        self.offset = 0.0  # Sideways distance from the path's centre line, set by separation
         
     def update(self, game_speed):
         if not self.alive or self.path_index >= len(self.path) - 1:
@@ -412,53 +725,122 @@ class Enemy:
             dx /= distance
             dy /= distance
         
-        # Move enemy
-        self.x += dx * self.speed * game_speed
-        self.y += dy * self.speed * game_speed
-        self.progress += self.speed * game_speed
+        # Move enemy; the position is worked out from the progress, so it
+        # never drifts off the path and follows changes to ``offset``
+        self.progress += self.speed * self.pace * game_speed
+        self.x = current[0] + dx * self.progress - dy * self.offset
+        self.y = current[1] + dy * self.progress + dx * self.offset
         
         # Check if reached next waypoint
         if self.progress >= distance:
             self.path_index += 1
             self.progress = 0
+            self.place()
             
             # Check if reached the end
             if self.path_index >= len(self.path) - 1:
                 self.alive = False
     
+    def place(self):
+        """Set x, y from the position along the path, ``offset`` to the side of it"""
+        if self.path_index >= len(self.path) - 1:
+            self.x, self.y = self.path[-1]
+            return
+        current = self.path[self.path_index]
+        next_point = self.path[self.path_index + 1]
+        dx = next_point[0] - current[0]
+        dy = next_point[1] - current[1]
+        distance = math.sqrt(dx**2 + dy**2)
+        if distance > 0:
+            dx /= distance
+            dy /= distance
+        self.x = current[0] + dx * self.progress - dy * self.offset
+        self.y = current[1] + dy * self.progress + dx * self.offset
+    
+    def follow_field(self, field, game_speed):
+        """Maze mode: walk towards the next cell of the shared flow field"""
+        if not self.alive:
+            return
+        target = field.next_point(self.x, self.y)
+        if target is None:
+            # Reached the exit
+            self.path_index = len(self.path) - 1
+            self.alive = False
+            return
+        dx = target[0] - self.x
+        dy = target[1] - self.y
+        distance = math.sqrt(dx**2 + dy**2)
+        step = self.speed * self.pace * game_speed
+        if distance <= step:
+            self.x, self.y = target
+        else:
+            self.x += dx / distance * step
+            self.y += dy / distance * step
+    
+    def route(self, field=None):
+        """Waypoints still ahead: the rest of the path, or in maze mode where
+        the enemy turns on its way across the flow field"""
+        if field is None:
+            return itertools.islice(self.path, self.path_index + 1, None)
+        return field.route(self.x, self.y)
+    
     def take_damage(self, damage):
         self.health -= damage
         if self.health <= 0:
             self.alive = False
     
-    def draw(self, screen):
-        if self.alive:
-            if self.use_image:
-                # Draw enemy image
-                rect = self.image.get_rect(center=(int(self.x), int(self.y)))
-                screen.blit(self.image, rect)
-            else:
-                # Draw enemy as circle if image not available
-                pygame.draw.circle(screen, self.properties["color"], 
-                                 (int(self.x), int(self.y)), self.properties["size"])
-            
-            # Draw health bar
-            bar_width = 30
-            bar_height = 4
-            health_percentage = self.health / self.max_health
-            pygame.draw.rect(screen, RED, 
-                           (self.x - bar_width//2, self.y - self.properties["size"] - 10, 
-                            bar_width, bar_height))
-            pygame.draw.rect(screen, GREEN, 
-                           (self.x - bar_width//2, self.y - self.properties["size"] - 10, 
-                            int(bar_width * health_percentage), bar_height))
+    def pack_state(self, writer):
+        writer.pack("BBI?dddddddd?", ENEMY_TYPE_NAMES.index(self.type), self.lane, self.path_index, self.alive,
+                    self.x, self.y, self.progress, self.offset, self.health, self.max_health, self.speed,
+                    self.reward, self.effects is not None)
+        if self.effects is not None:
+            writer.floats(self.effects)
+    
+    def unpack_state(self, reader, lanes):
+        self.lane, = reader.unpack("B")
+        self.path = lanes[self.lane]
+        (self.path_index, self.alive, self.x, self.y, self.progress, self.offset, self.health,
+         self.max_health, self.speed, self.reward, affected) = reader.unpack("I?dddddddd?")
+        self.effects = reader.floats() if affected else None
+        self.pace = effect_pace(self.effects)
+    
+    def snapshot(self):
+        return EnemySnapshot(self.type, self.x, self.y, self.health, self.max_health,
+                             self.stats.size, self.stats.color, self.stats.image)
+    
+    @staticmethod
+    def draw(batch, view, state, detail=LevelOfDetail.FULL):
+        if state.image:
+            # Draw enemy image
+            image = view.sprite(state.type, state.image)
+        else:
+            # Draw enemy as circle if image not available
+            image = view.circle(state.color, state.size)
+        batch.add(LAYER_ENEMIES, image, image.get_rect(center=view.to_screen(state.x, state.y)))
+        
+        # Reduced detail skips the bar at full health, minimal detail above half health
+        if detail >= LevelOfDetail.REDUCED and state.health >= state.max_health:
+            return
+        if detail == LevelOfDetail.MINIMAL and state.health * 2 > state.max_health:
+            return
+        
+        # Draw health bar: the green bar is clipped to the remaining health
+        bar_width = 30
+        bar_height = 4
+        health_percentage = max(0, state.health / state.max_health)
+        bar = view.rect(state.x - bar_width//2, state.y - state.size - 10, bar_width, bar_height)
+        # Minimal detail leaves out the red background
+        if detail < LevelOfDetail.MINIMAL:
+            batch.add(LAYER_HEALTH_BARS, view.fill(RED, bar.size), bar)
+        batch.add(LAYER_HEALTH_BARS, view.fill(GREEN, bar.size), bar,
+                  (0, 0, int(bar.width * health_percentage), bar.height))
 class PathGenerator:
     @staticmethod
     def generate_circular_path():
         # Create a circular path with smooth curves
-        center_x = GAME_FIELD_WIDTH // 2
-        center_y = SCREEN_HEIGHT // 2
-        radius = min(GAME_FIELD_WIDTH, SCREEN_HEIGHT) // 3
+        center_x = WORLD_WIDTH // 2
+        center_y = WORLD_HEIGHT // 2
+        radius = min(WORLD_WIDTH, WORLD_HEIGHT) // 3
         
         # Number of points on the circle
         num_points = 20
@@ -473,7 +855,7 @@ class PathGenerator:
         
         # Adjust start and end points
         path[0] = (0, center_y)
-        path[-1] = (GAME_FIELD_WIDTH, center_y)
+        path[-1] = (WORLD_WIDTH, center_y)
         
         return path
     
@@ -483,17 +865,17 @@ class PathGenerator:
         path = []
         
         # Start point
-        path.append((0, SCREEN_HEIGHT // 2))
+        path.append((0, WORLD_HEIGHT // 2))
         
         # Add some curves
-        path.append((GAME_FIELD_WIDTH // 4, SCREEN_HEIGHT // 2))
-        path.append((GAME_FIELD_WIDTH // 3, SCREEN_HEIGHT // 3))
-        path.append((GAME_FIELD_WIDTH // 2, SCREEN_HEIGHT // 3))
-        path.append((2 * GAME_FIELD_WIDTH // 3, SCREEN_HEIGHT // 2))
-        path.append((3 * GAME_FIELD_WIDTH // 4, SCREEN_HEIGHT // 2))
+        path.append((WORLD_WIDTH // 4, WORLD_HEIGHT // 2))
+        path.append((WORLD_WIDTH // 3, WORLD_HEIGHT // 3))
+        path.append((WORLD_WIDTH // 2, WORLD_HEIGHT // 3))
+        path.append((2 * WORLD_WIDTH // 3, WORLD_HEIGHT // 2))
+        path.append((3 * WORLD_WIDTH // 4, WORLD_HEIGHT // 2))
         
         # End point
-        path.append((GAME_FIELD_WIDTH, SCREEN_HEIGHT // 2))
+        path.append((WORLD_WIDTH, WORLD_HEIGHT // 2))
         
         return path
     
@@ -503,28 +885,28 @@ class PathGenerator:
         path = []
         
         # Start point
-        path.append((0, SCREEN_HEIGHT // 2))
+        path.append((0, WORLD_HEIGHT // 2))
         
         # Create zigzag pattern
         segments = 6
         for i in range(segments):
-            x = (i + 1) * GAME_FIELD_WIDTH // segments
+            x = (i + 1) * WORLD_WIDTH // segments
             if i % 2 == 0:
-                y = SCREEN_HEIGHT // 3
+                y = WORLD_HEIGHT // 3
             else:
-                y = 2 * SCREEN_HEIGHT // 3
+                y = 2 * WORLD_HEIGHT // 3
             path.append((x, y))
         
         # End point
-        path.append((GAME_FIELD_WIDTH, SCREEN_HEIGHT // 2))
+        path.append((WORLD_WIDTH, WORLD_HEIGHT // 2))
         
         return path
     
     @staticmethod
     def generate_spiral_path():
         # Create a spiral path
-        center_x = GAME_FIELD_WIDTH // 2
-        center_y = SCREEN_HEIGHT // 2
+        center_x = WORLD_WIDTH // 2
+        center_y = WORLD_HEIGHT // 2
         path = []
         
         # Start point
@@ -533,7 +915,7 @@ class PathGenerator:
         # Create spiral
         num_turns = 2
         points_per_turn = 20
-        max_radius = min(GAME_FIELD_WIDTH, SCREEN_HEIGHT) // 3
+        max_radius = min(WORLD_WIDTH, WORLD_HEIGHT) // 3
         
         for i in range(num_turns * points_per_turn + 1):
             angle = (i / points_per_turn) * math.pi * 2
@@ -543,7 +925,7 @@ class PathGenerator:
             path.append((x, y))
         
         # End point
-        path.append((GAME_FIELD_WIDTH, center_y))
+        path.append((WORLD_WIDTH, center_y))
         
         return path
     
@@ -553,19 +935,19 @@ class PathGenerator:
         path = []
         
         # Start point
-        path.append((0, SCREEN_HEIGHT // 2))
+        path.append((0, WORLD_HEIGHT // 2))
         
         # Create wave pattern
         segments = 8
-        amplitude = SCREEN_HEIGHT // 4
+        amplitude = WORLD_HEIGHT // 4
         
         for i in range(1, segments):
-            x = i * GAME_FIELD_WIDTH // segments
-            y = SCREEN_HEIGHT // 2 + amplitude * math.sin(i * math.pi / 2)
+            x = i * WORLD_WIDTH // segments
+            y = WORLD_HEIGHT // 2 + amplitude * math.sin(i * math.pi / 2)
             path.append((x, y))
         
         # End point
-        path.append((GAME_FIELD_WIDTH, SCREEN_HEIGHT // 2))
+        path.append((WORLD_WIDTH, WORLD_HEIGHT // 2))
         
         return path
     
@@ -575,45 +957,112 @@ class PathGenerator:
         path = []
         
         # Start point
-        start_y = random.randint(SCREEN_HEIGHT // 4, 3 * SCREEN_HEIGHT // 4)
+        start_y = random.randint(WORLD_HEIGHT // 4, 3 * WORLD_HEIGHT // 4)
         path.append((0, start_y))
         
         # Generate random waypoints
-        num_waypoints = random.randint(3, 7)
+        num_waypoints = random.randint(3, 7) * MAP_SCREENS
         for i in range(1, num_waypoints):
-            x = i * GAME_FIELD_WIDTH // (num_waypoints + 1)
-            y = random.randint(SCREEN_HEIGHT // 5, 4 * SCREEN_HEIGHT // 5)
+            x = i * WORLD_WIDTH // (num_waypoints + 1)
+            y = random.randint(WORLD_HEIGHT // 5, 4 * WORLD_HEIGHT // 5)
             path.append((x, y))
         
         # End point
-        end_y = random.randint(SCREEN_HEIGHT // 4, 3 * SCREEN_HEIGHT // 4)
-        path.append((GAME_FIELD_WIDTH, end_y))
+        end_y = random.randint(WORLD_HEIGHT // 4, 3 * WORLD_HEIGHT // 4)
+        path.append((WORLD_WIDTH, end_y))
         
         return path
     
     @staticmethod
-    def generate_all_paths():
-        # Generate 50 different path combinations
-        paths = []
+    def generate_merging_lanes():
+        # Two lanes enter at the top and bottom of the left edge and share the road after meeting
+        merge_x = WORLD_WIDTH // 3
+        merge_y = random.randint(2 * WORLD_HEIGHT // 5, 3 * WORLD_HEIGHT // 5)
+        shared = [(merge_x, merge_y)]
+        for i in range(1, 4):
+            x = merge_x + i * (WORLD_WIDTH - merge_x) // 4
+            shared.append((x, random.randint(WORLD_HEIGHT // 5, 4 * WORLD_HEIGHT // 5)))
+        shared.append((WORLD_WIDTH, random.randint(WORLD_HEIGHT // 4, 3 * WORLD_HEIGHT // 4)))
+        
+        top = [(0, WORLD_HEIGHT // 6), (merge_x // 2, WORLD_HEIGHT // 4)] + shared
+        bottom = [(0, 5 * WORLD_HEIGHT // 6), (merge_x // 2, 3 * WORLD_HEIGHT // 4)] + shared
+        return [top, bottom]
+    
+    @staticmethod
+    def generate_parallel_lanes():
+        # A random road with two lanes running side by side, LANE_GAP apart
+        center = PathGenerator.generate_random_path()
+        low = WORLD_HEIGHT // 5 + LANE_GAP // 2
+        high = 4 * WORLD_HEIGHT // 5 - LANE_GAP // 2
+        center = [(x, min(max(y, low), high)) for x, y in center]
+        return [[(x, y - LANE_GAP // 2) for x, y in center],
+                [(x, y + LANE_GAP // 2) for x, y in center]]
+    
+    @staticmethod
+    def generate_maze_gates():
+        # Maze mode: an entrance on the left edge and an exit on the right, on cell centres
+        y = GRID_ROWS // 2 * GRID_SIZE + GRID_SIZE // 2
+        return [[(GRID_SIZE // 2, y), ((GRID_COLS - 1) * GRID_SIZE + GRID_SIZE // 2, y)]]
+    
+    @staticmethod
+    def generate_all_maps():
+        # Generate 50 maps, each a list of lanes (paths) enemies are split across
+        maps = []
         
         # Add the original 3 paths
-        paths.append(PathGenerator.generate_circular_path())
-        paths.append(PathGenerator.generate_straight_path())
-        paths.append(PathGenerator.generate_zigzag_path())
+        maps.append([PathGenerator.generate_circular_path()])
+        maps.append([PathGenerator.generate_straight_path()])
+        maps.append([PathGenerator.generate_zigzag_path()])
         
         # Add spiral and wave paths
-        paths.append(PathGenerator.generate_spiral_path())
-        paths.append(PathGenerator.generate_wave_path())
-        
-        # Generate 45 random paths
-        for _ in range(45):
-            paths.append(PathGenerator.generate_random_path())
-        
-        return paths
+        maps.append([PathGenerator.generate_spiral_path()])
+        maps.append([PathGenerator.generate_wave_path()])
+        
+        # Generate 45 more, every third one with two lanes that merge or run in parallel
+        for i in range(45):
+            if i % 6 == 2:
+                maps.append(PathGenerator.generate_merging_lanes())
+            elif i % 6 == 5:
+                maps.append(PathGenerator.generate_parallel_lanes())
+            else:
+                maps.append([PathGenerator.generate_random_path()])
+        
+        return maps
+def draw_band(surface, color, start, end, width):
+    """Like a thick pygame.draw.line, which drops the whole band once its
+    centre line is clipped off the surface. The same band as a polygon
+    still shows the part that reaches in, which chunk edges rely on."""
+    (x1, y1), (x2, y2) = start, end
+    half = width / 2
+    if abs(x2 - x1) >= abs(y2 - y1):
+        points = [(x1, y1 - half), (x2, y2 - half), (x2, y2 + half), (x1, y1 + half)]
+    else:
+        points = [(x1 - half, y1), (x2 - half, y2), (x2 + half, y2), (x1 + half, y1)]
+    pygame.draw.polygon(surface, color, points)
+
 class Game:
     def __init__(self):
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Forest Protector")
+        
+        # Sprites decoded by main() only need converting to the display format
+        convert_all(ASSET_SPECS)
+        
+        # The game field is rendered at an internal resolution and stretched to the window
+        self.viewport = Viewport(self.screen, (0, 0, GAME_FIELD_WIDTH, SCREEN_HEIGHT),
+                                 (GAME_FIELD_WIDTH, SCREEN_HEIGHT), (WORLD_WIDTH, WORLD_HEIGHT), RENDER_SCALE,
+                                 SpriteCache(SPRITE_CACHE_PIXELS, load_source))
+        self.auto_render_scale = AutoRenderScale(RENDER_SCALES, 1 / FPS) if AUTO_RENDER_SCALE else None
+        self.sprite_batch = SpriteBatch(LAYER_HEALTH_BARS + 1)
+        self.level_of_detail = LevelOfDetail(LOD_ENTITY_THRESHOLDS, LOD_FRAME_BUDGET)
+        self.blit_count = 0
+        self.show_debug = False  # Frame stats and detail level, toggled with F3
+        # Grass and lanes, cached in chunks per map and render scale
+        self.background = ChunkCache(BACKGROUND_CHUNK_SIZE, self.render_background, BACKGROUND_CACHE_PIXELS)
+        # Shot, death and leak sounds; silent in batch mode
+        self.audio = SoundPool(AUDIO_CHANNELS, SOUND_SETTINGS, enabled=not HEADLESS)
+        self.background_lanes = None
+        self.minimap = Minimap(MINIMAP_AREA, (WORLD_WIDTH, WORLD_HEIGHT), MINIMAP_REFRESH_FRAMES)
         self.clock = pygame.time.Clock()
         self.running = True
         self.restart_available = False
@@ -625,9 +1074,29 @@ class Game:
         self.lives = self.difficulty_settings["starting_lives"]
         self.wave = 0
         self.enemies = []
+        self.spawn_queue = SpawnQueue()  # Enemies not yet released onto the path
+        self.sim_time = 0.0  # Simulated seconds, scaled by game speed
         self.towers = []
         self.selected_tower = None
-        self.last_wave_time = time.time()
+        self.ready_towers = []  # Reloaded towers, in the order they get target scans
+        self.reloading_towers = EventQueue()  # Towers by the simulation time they reload
+        self.target_scans = 0  # Full target scans performed last tick
+        
+        # Headless runs resolve shots as scheduled hits instead of moving projectiles
+        self.analytic_projectiles = False
+        self.impacts = EventQueue()  # Projectiles by the simulation time they hit
+        self.maze = MAZE_MODE
+        # Steps to the exit from every grid cell, shared by all enemies in maze mode
+        self.flow_field = FlowField(GRID_COLS, GRID_ROWS, GRID_SIZE) if self.maze else None
+        if self.maze:
+            self.enemy_index = FieldIndex(self.flow_field, ENEMY_BUCKET_SIZE)  # Active enemies by position
+        else:
+            self.enemy_index = LaneIndex()  # Active enemies in arc-length order, per lane
+        self.status_effects = StatusEffects()  # Enemies that are slowed, frozen or burning
+        self.separation = Separation(SEPARATION_RADIUS, SEPARATION_MAX_OFFSET, SEPARATION_SPEED,
+                                     SEPARATION_INTERVAL)
+        self.recording = True  # Autosaves and rewind snapshots
+        self.last_wave_time = self.sim_time
         self.game_start_time = time.time()
         self.font = pygame.font.SysFont(None, 36)
         self.small_font = pygame.font.SysFont(None, 24)
@@ -635,10 +1104,13 @@ class Game:
         self.min_difficulty = 1
         self.max_difficulty = 5
         
-        # Generate all 50 paths
-        self.all_paths = PathGenerator.generate_all_paths()
+        # Generate all 50 maps
+        if self.maze:
+            self.all_maps = [PathGenerator.generate_maze_gates()]
+        else:
+            self.all_maps = PathGenerator.generate_all_maps()
         self.current_path_index = 0
-        self.path = self.all_paths[self.current_path_index]
+        self.set_lanes(self.all_maps[self.current_path_index])
         
         self.hover_grid = None
         self.selected_tower_type = TowerType.ARCHER
@@ -646,7 +1118,7 @@ class Game:
         # Path change and refund settings
         self.enable_refund = True  # Toggle for refund system
         self.refund_percentage = 0.75  # 75% refund when path changes
-        self.auto_change_path = True  # Automatically change path after each wave
+        self.auto_change_path = not self.maze  # Automatically change path after each wave
         
         # Create assets directory if it doesn't exist
         if not os.path.exists("assets"):
@@ -656,6 +1128,8 @@ class Game:
         self.base_enemies = 5  # Starting number of enemies
         self.enemy_increment = 2  # Additional enemies per wave
         self.max_enemies_per_wave = 25  # Maximum enemies in a wave
+        self.endless = ENDLESS  # No wave cap, no victory and no time limit
+        self.tick_time = 0.0  # Smoothed seconds per simulation tick
         
         # Game speed control
         self.game_speed = 1.0
@@ -663,17 +1137,15 @@ class Game:
         self.min_speed = 0.1
         self.max_speed = 2.0
         try:
-            self.grass_texture = pygame.image.load("assets/grass.png").convert_alpha()
-            # Scale grass texture to cover the game field
-            self.grass_texture = pygame.transform.scale(self.grass_texture, (GAME_FIELD_WIDTH, SCREEN_HEIGHT))
+            # Grass covers the game field and has no transparency
+            self.grass_texture = load_image("grass", (GAME_FIELD_WIDTH, SCREEN_HEIGHT), opaque=True)
         except Exception as e:
             print(f"Error loading grass texture: {e}")
             self.grass_texture = None
 
         try:
-            self.road_texture = pygame.image.load("assets/road.png").convert_alpha()
-            # Scale road texture to match path width
-            self.road_texture = pygame.transform.scale(self.road_texture, (PATH_WIDTH, PATH_WIDTH))
+            # Road texture matches the path width
+            self.road_texture = load_image("road", (PATH_WIDTH, PATH_WIDTH), opaque=True)
         except Exception as e:
             print(f"Error loading road texture: {e}")
             self.road_texture = None
@@ -681,6 +1153,15 @@ class Game:
         # Create UI buttons
         self.create_ui_buttons()
         
+        # Save files
+        self.autosave_writer = AutosaveWriter(SAVE_FILE)
+        self.last_autosave_time = time.time()
+        
+        # Rewind history, scrubbed with [ and ] while paused
+        self.rewind_buffer = RewindBuffer(REWIND_HISTORY, REWIND_MEMORY_LIMIT)
+        self.last_rewind_time = 0.0
+        self.rewind_cursor = None  # Index of the snapshot shown while scrubbing
+        
     def create_ui_buttons(self):
         # Speed control buttons
         self.speed_up_button = Button(
@@ -723,11 +1204,34 @@ class Game:
     def restart_game(self):
         self.__init__()  # Reset all game attributes
         self.restart_available = True
+    def update_camera(self):
+        # Held WASD or left/right keys scroll maps larger than the field
+        keys = pygame.key.get_pressed()
+        dx = (keys[pygame.K_d] or keys[pygame.K_RIGHT]) - (keys[pygame.K_a] or keys[pygame.K_LEFT])
+        dy = keys[pygame.K_s] - keys[pygame.K_w]
+        if dx or dy:
+            step = CAMERA_SPEED / FPS / self.viewport.zoom
+            self.viewport.scroll(dx * step, dy * step)
+
+    def change_zoom(self, delta, anchor=None):
+        index = ZOOM_LEVELS.index(self.viewport.zoom) if self.viewport.zoom in ZOOM_LEVELS else 0
+        index = max(0, min(len(ZOOM_LEVELS) - 1, index + delta))
+        if ZOOM_LEVELS[index] != self.viewport.zoom:
+            self.viewport.set_zoom(ZOOM_LEVELS[index], anchor)
+    
     def get_enemies_in_wave(self, wave):
         """Calculate number of enemies for the given wave"""
         enemies = self.base_enemies + (wave - 1) * self.enemy_increment
+        if self.endless:
+            return max(enemies, int(self.base_enemies * ENDLESS_COUNT_GROWTH ** (wave - 1)))
         return min(enemies, self.max_enemies_per_wave)
     
+    def get_health_scale(self, wave):
+        """Enemy health multiplier for the given wave; only endless waves grow"""
+        if not self.endless:
+            return 1.0
+        return ENDLESS_HEALTH_GROWTH ** max(0, wave - 10)
+    
     def get_enemy_type_for_wave(self, wave, enemy_index, total_enemies):
         """Determine enemy type based on wave and position in wave"""
         if wave < 3:
@@ -752,6 +1256,10 @@ class Game:
             else:
                 return "goblin"
     
+    def wave_cleared(self):
+        """True when no enemy is on the field or waiting to spawn"""
+        return not self.enemies and not self.spawn_queue
+    
     def change_difficulty(self, delta):
         new_difficulty = max(self.min_difficulty, min(self.max_difficulty, self.difficulty + delta))
         if new_difficulty != self.difficulty:
@@ -781,10 +1289,7 @@ class Game:
                 elif event.key == pygame.K_3:
                     self.selected_tower_type = TowerType.MAGIC
                 elif event.key == pygame.K_p:  # Pause game
-                    if self.game_state == "playing":
-                        self.game_state = "paused"
-                    elif self.game_state == "paused":
-                        self.game_state = "playing"
+                    self.toggle_pause()
                 elif event.key == pygame.K_c:  # Change path manually
                     self.change_path()
                 elif event.key == pygame.K_UP:  # Increase game speed
@@ -795,12 +1300,42 @@ class Game:
                     self.change_difficulty(1)
                 elif event.key == pygame.K_MINUS or event.key == pygame.K_UNDERSCORE:
                     self.change_difficulty(-1)
+                elif event.key == pygame.K_F5:  # Quick save
+                    self.save_game()
+                elif event.key == pygame.K_F9:  # Quick load
+                    self.load_game()
+                elif event.key == pygame.K_F2:  # Cycle render scale
+                    self.cycle_render_scale()
+                elif event.key == pygame.K_x:  # Sell the tower under the cursor
+                    world_pos = self.viewport.screen_to_world(pygame.mouse.get_pos())
+                    if world_pos is not None:
+                        self.sell_tower_at(*world_pos)
+                elif event.key == pygame.K_F3:  # Toggle debug overlay
+                    self.show_debug = not self.show_debug
+                elif event.key == pygame.K_e:  # Zoom in
+                    self.change_zoom(1)
+                elif event.key == pygame.K_q:  # Zoom out
+                    self.change_zoom(-1)
+                elif event.key == pygame.K_LEFTBRACKET and self.game_state == "paused":
+                    self.scrub_rewind(-1)
+                elif event.key == pygame.K_RIGHTBRACKET and self.game_state == "paused":
+                    self.scrub_rewind(1)
+            elif event.type == pygame.MOUSEWHEEL:
+                # Zoom around the world point under the cursor
+                world_pos = self.viewport.screen_to_world(pygame.mouse.get_pos())
+                if world_pos is not None and event.y:
+                    self.change_zoom(1 if event.y > 0 else -1, world_pos)
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left click
-                    mouse_x, mouse_y = pygame.mouse.get_pos()
+                    # Clicking the minimap moves the camera there
+                    minimap_pos = self.minimap.to_world(event.pos)
+                    if minimap_pos is not None:
+                        self.viewport.center_on(*minimap_pos)
+                    world_pos = self.viewport.screen_to_world(event.pos)
                     
                     # Check if clicking in game field area
-                    if mouse_x < GAME_FIELD_WIDTH:
+                    if world_pos is not None:
+                        mouse_x, mouse_y = world_pos
                         # Check if clicking on a tower to upgrade
                         for tower in self.towers:
                             if math.sqrt((tower.x - mouse_x)**2 + (tower.y - mouse_y)**2) < 20:
@@ -813,31 +1348,19 @@ class Game:
                         grid_x = mouse_x // GRID_SIZE
                         grid_y = mouse_y // GRID_SIZE
                         
-                        # Check if position is valid (not on path)
-                        valid_position = True
-                        for i in range(len(self.path) - 1):
-                            x1, y1 = self.path[i]
-                            x2, y2 = self.path[i + 1]
-                            
-                            # Check if grid cell is near the path
-                            cell_x = grid_x * GRID_SIZE + GRID_SIZE // 2
-                            cell_y = grid_y * GRID_SIZE + GRID_SIZE // 2
-                            
-                            # Simple distance check to path segment
-                            dist_to_segment = self.point_to_line_distance(
-                                (cell_x, cell_y), (x1, y1), (x2, y2)
-                            )
-                            
-                            if dist_to_segment < PATH_WIDTH / 2 + GRID_SIZE:
-                                valid_position = False
-                                break
+                        # Check if position is valid (not on any lane)
+                        valid_position = (grid_x, grid_y) not in self.blocked_cells
                             
                         tower_cost = TOWER_SETTINGS[self.selected_tower_type]["cost"]
-                        if valid_position and self.money >= tower_cost:
+                        if valid_position and self.money >= tower_cost and self.claim_cell((grid_x, grid_y)):
                             self.money -= tower_cost
                             tower_x = grid_x * GRID_SIZE + GRID_SIZE // 2
                             tower_y = grid_y * GRID_SIZE + GRID_SIZE // 2
-                            self.towers.append(Tower(tower_x, tower_y, self.selected_tower_type, self.difficulty))
+                            self.add_tower(Tower(tower_x, tower_y, self.selected_tower_type, self.difficulty))
+                elif event.button == 3:  # Right click
+                    world_pos = self.viewport.screen_to_world(event.pos)
+                    if world_pos is not None:
+                        self.cycle_target_priority(*world_pos)
             
             # Handle button events
             if self.speed_up_button.handle_event(event):
@@ -847,10 +1370,7 @@ class Game:
             if self.path_button.handle_event(event):
                 self.change_path()
             if self.pause_button.handle_event(event):
-                if self.game_state == "playing":
-                    self.game_state = "paused"
-                elif self.game_state == "paused":
-                    self.game_state = "playing"
+                self.toggle_pause()
             if self.difficulty_up_button.handle_event(event):
                 self.change_difficulty(1)
             if self.difficulty_down_button.handle_event(event):
@@ -860,6 +1380,42 @@ class Game:
                 if button.handle_event(event):
                     self.selected_tower_type = tower_type
     
+    def cycle_target_priority(self, x, y):
+        for tower in self.towers:
+            if math.sqrt((tower.x - x)**2 + (tower.y - y)**2) < 20:
+                tower.priority = tower.priority.next()
+                tower.target = None  # Pick a target under the new priority
+                return
+    
+    def toggle_pause(self):
+        if self.game_state == "playing":
+            self.game_state = "paused"
+        elif self.game_state == "paused":
+            if self.rewind_cursor is not None:
+                # Play continues from the rewound point, so the newer history is dropped
+                self.rewind_buffer.truncate_after(self.rewind_cursor)
+                self.rewind_cursor = None
+            self.game_state = "playing"
+    
+    def set_render_scale(self, scale):
+        if scale != self.viewport.render_scale:
+            self.viewport.set_scale(scale)
+    
+    def cycle_render_scale(self):
+        # Auto -> 100% -> 75% -> 50% -> Auto
+        if self.auto_render_scale:
+            self.auto_render_scale = None
+            self.set_render_scale(RENDER_SCALES[-1])
+        elif self.viewport.render_scale == RENDER_SCALES[0]:
+            self.auto_render_scale = AutoRenderScale(RENDER_SCALES, 1 / FPS)
+        else:
+            self.set_render_scale(RENDER_SCALES[RENDER_SCALES.index(self.viewport.render_scale) - 1])
+    
+    def record_frame_time(self, frame_time):
+        self.level_of_detail.record_frame_time(frame_time)
+        if self.auto_render_scale:
+            self.set_render_scale(self.auto_render_scale.update(self.viewport.render_scale, frame_time))
+    
     def change_game_speed(self, delta):
         self.game_speed = max(self.min_speed, min(self.max_speed, self.game_speed + delta))
     
@@ -885,10 +1441,87 @@ class Game:
         # Return distance to closest point
         return math.sqrt((x0 - closest_x)**2 + (y0 - closest_y)**2)
     
+    def add_tower(self, tower):
+        self.towers.append(tower)
+        self.ready_towers.append(tower)
+    
+    def schedule_towers(self, ready=None):
+        # Rebuild the reload schedule after towers were replaced or removed.
+        # ``ready`` restores a saved scan order; every other tower reloads.
+        self.reloading_towers.clear()
+        if ready is not None:
+            self.ready_towers = list(ready)
+            waiting = set(map(id, ready))
+            for tower in self.towers:
+                if id(tower) not in waiting:
+                    self.reloading_towers.push(tower.ready_time, tower)
+            return
+        self.ready_towers = []
+        for tower in self.towers:
+            if tower.ready_time <= self.sim_time:
+                self.ready_towers.append(tower)
+            else:
+                self.reloading_towers.push(tower.ready_time, tower)
+    
+    def set_lanes(self, lanes):
+        self.lanes = lanes
+        if self.maze:
+            # Lanes only mark the gates; enemies route around the towers on the flow field
+            self.flow_field.reset([self.grid_cell(*lane[-1]) for lane in lanes],
+                                  [self.grid_cell(tower.x, tower.y) for tower in self.towers])
+            self.blocked_cells = {self.grid_cell(*point) for lane in lanes for point in (lane[0], lane[-1])}
+        else:
+            self.enemy_index.set_lanes(lanes)
+            self.blocked_cells = self.find_blocked_cells(lanes)
+    
+    @staticmethod
+    def grid_cell(x, y):
+        # Clamped, so a point on the map's far edge doesn't wrap onto the next flow field row
+        return (min(GRID_COLS - 1, max(0, int(x // GRID_SIZE))), min(GRID_ROWS - 1, max(0, int(y // GRID_SIZE))))
+    
+    def claim_cell(self, cell):
+        """In maze mode, block ``cell`` on the flow field unless that walls an
+        entrance or any enemy off from the exit. Always allowed otherwise."""
+        if not self.maze:
+            return True
+        required = {self.grid_cell(*lane[0]) for lane in self.lanes}
+        required.update(self.grid_cell(enemy.x, enemy.y) for enemy in self.enemies)
+        return self.flow_field.try_block(cell, required)
+    
+    def sell_tower_at(self, x, y):
+        for tower in self.towers:
+            if math.sqrt((tower.x - x)**2 + (tower.y - y)**2) < 20:
+                self.money += int(tower.total_cost * self.refund_percentage)
+                self.towers.remove(tower)
+                self.schedule_towers()
+                if self.maze:
+                    self.flow_field.unblock(self.grid_cell(tower.x, tower.y))
+                return
+    
+    def find_blocked_cells(self, lanes):
+        """Grid cells too close to any lane to build on, worked out once per map"""
+        margin = PATH_WIDTH / 2 + GRID_SIZE
+        blocked = set()
+        for lane in lanes:
+            for (x1, y1), (x2, y2) in zip(lane, lane[1:]):
+                # Only cells within the margin of the segment's bounding box can be too close
+                min_x = max(0, int((min(x1, x2) - margin) // GRID_SIZE))
+                max_x = min(GRID_COLS - 1, int((max(x1, x2) + margin) // GRID_SIZE))
+                min_y = max(0, int((min(y1, y2) - margin) // GRID_SIZE))
+                max_y = min(GRID_ROWS - 1, int((max(y1, y2) + margin) // GRID_SIZE))
+                for grid_x in range(min_x, max_x + 1):
+                    for grid_y in range(min_y, max_y + 1):
+                        if (grid_x, grid_y) in blocked:
+                            continue
+                        cell = (grid_x * GRID_SIZE + GRID_SIZE // 2, grid_y * GRID_SIZE + GRID_SIZE // 2)
+                        if self.point_to_line_distance(cell, (x1, y1), (x2, y2)) < margin:
+                            blocked.add((grid_x, grid_y))
+        return blocked
+    
     def change_path(self):
-        # Move to the next path in the list (cycle through all 50)
-        self.current_path_index = (self.current_path_index + 1) % len(self.all_paths)
-        new_path = self.all_paths[self.current_path_index]
+        # Move to the next map in the list (cycle through all 50)
+        self.current_path_index = (self.current_path_index + 1) % len(self.all_maps)
+        new_lanes = self.all_maps[self.current_path_index]
         
         # Refund all towers if enabled
         if self.enable_refund:
@@ -899,15 +1532,196 @@ class Game:
             
             self.money += total_refund
             self.towers.clear()  # Remove all towers
+            self.schedule_towers()
         
-        # Update the path
-        self.path = new_path
+        # Update the lanes
+        self.set_lanes(new_lanes)
         
-        # Update enemy paths
+        # Move enemies onto the new map, keeping their lane where it still exists
         for enemy in self.enemies:
-            enemy.path = new_path
+            enemy.lane %= len(new_lanes)
+            enemy.path = new_lanes[enemy.lane]
+        for enemy in self.spawn_queue:
+            enemy.lane %= len(new_lanes)
+            enemy.path = new_lanes[enemy.lane]
+        self.enemy_index.rebuild(self.enemies)
+    
+    def save_state(self):
+        """Pack the complete game state into a compact binary snapshot"""
+        current_time = time.time()
+        writer = SnapshotWriter()
+        writer.pack("ddiiBBBdddd?B?B", self.score, self.money, self.lives, self.wave, self.difficulty,
+                    GAME_STATES.index(self.game_state), self.selected_tower_type.value,
+                    self.game_speed, self.sim_time, current_time - self.game_start_time,
+                    self.sim_time - self.last_wave_time, self.maze, MAP_SCREENS, self.endless,
+                    self.separation.ticks)
+        pack_rng_state(writer, random.getstate())
+        
+        # Maps as lane counts followed by each lane's flat coordinate array
+        writer.pack("HH", len(self.all_maps), self.current_path_index)
+        for lanes in self.all_maps:
+            writer.pack("B", len(lanes))
+            for path in lanes:
+                writer.floats([coord for point in path for coord in point])
+        
+        # Active enemies first, then waiting ones; projectiles refer to them by index
+        pending = self.spawn_queue.items()
+        enemy_ids = {}
+        writer.pack("II", len(self.enemies), len(pending))
+        for enemy in self.enemies:
+            enemy_ids[id(enemy)] = len(enemy_ids)
+            enemy.pack_state(writer)
+        for spawn_time, enemy in pending:
+            enemy_ids[id(enemy)] = len(enemy_ids)
+            writer.pack("d", spawn_time)
+            enemy.pack_state(writer)
+        
+        writer.pack("I", len(self.towers))
+        for tower in self.towers:
+            tower.pack_state(writer, self.sim_time, enemy_ids)
+        # Reloaded towers in their scan order, which decides who gets this tick's target scans
+        tower_ids = {id(tower): index for index, tower in enumerate(self.towers)}
+        writer.uints([tower_ids[id(tower)] for tower in self.ready_towers])
+        return writer.getvalue()
+    
+    def load_state(self, data):
+        """Restore a snapshot made by save_state. Raises SnapshotError if it is invalid."""
+        current_time = time.time()
+        reader = SnapshotReader(data)
+        (score, money, lives, wave, difficulty, game_state, tower_type, game_speed, sim_time,
+         elapsed, since_last_wave, maze, map_screens, endless, separation_ticks) = reader.unpack("ddiiBBBdddd?B?B")
+        # A road map's lanes don't make maze gates, and maze towers stand on the road
+        if maze != self.maze:
+            raise SnapshotError(f"snapshot was saved {'with' if maze else 'without'} --maze")
+        # Lanes are laid out for the map width they were made for
+        if map_screens != MAP_SCREENS:
+            raise SnapshotError(f"snapshot was saved {'with' if map_screens > 1 else 'without'} --wide")
+        # Past wave 10 an endless game would be declared won in a normal one
+        if endless != self.endless:
+            raise SnapshotError(f"snapshot was saved {'with' if endless else 'without'} --endless")
+        rng_state = unpack_rng_state(reader)
+        
+        num_maps, path_index = reader.unpack("HH")
+        all_maps = []
+        for _ in range(num_maps):
+            num_lanes, = reader.unpack("B")
+            lanes = []
+            for _ in range(num_lanes):
+                coords = reader.floats()
+                lanes.append(list(zip(coords[::2], coords[1::2])))
+            all_maps.append(lanes)
+        lanes = all_maps[path_index]
+        
+        # Restored entities are copies of one freshly built prototype per kind,
+        # which skips the constructors' per-entity setup
+        prototypes = {}
+        
+        def read_enemy():
+            type_index, = reader.unpack("B")
+            enemy_type = ENEMY_TYPE_NAMES[type_index]
+            if enemy_type not in prototypes:
+                prototypes[enemy_type] = Enemy(lanes[0], enemy_type, difficulty)
+            enemy = copy.copy(prototypes[enemy_type])
+            enemy.unpack_state(reader, lanes)
+            return enemy
+        
+        num_active, num_pending = reader.unpack("II")
+        enemies = [read_enemy() for _ in range(num_active)]
+        spawn_queue = SpawnQueue()
+        all_enemies = list(enemies)
+        for _ in range(num_pending):
+            spawn_time, = reader.unpack("d")
+            enemy = read_enemy()
+            spawn_queue.push(spawn_time, enemy)
+            all_enemies.append(enemy)
+        
+        num_towers, = reader.unpack("I")
+        towers = []
+        for _ in range(num_towers):
+            tower_kind = TowerType(reader.unpack("B")[0])
+            if tower_kind not in prototypes:
+                prototypes[tower_kind] = Tower(0, 0, tower_kind, difficulty)
+            tower = copy.copy(prototypes[tower_kind])
+            tower.unpack_state(reader, sim_time, all_enemies)
+            towers.append(tower)
+        ready_towers = [towers[index] for index in reader.uints()]
+        
+        # Everything parsed, so commit the new state in one go
+        self.score, self.money, self.lives, self.wave = score, money, lives, wave
+        self.difficulty = difficulty
+        self.difficulty_settings = DIFFICULTY_SETTINGS[difficulty]
+        self.game_state = GAME_STATES[game_state]
+        self.selected_tower_type = TowerType(tower_type)
+        self.game_speed = game_speed
+        self.sim_time = sim_time
+        self.game_start_time = current_time - elapsed
+        self.last_wave_time = sim_time - since_last_wave
+        self.separation.ticks = separation_ticks  # Passes run every few ticks; keep them on the same ticks
+        random.setstate(rng_state)
+        self.all_maps = all_maps
+        self.current_path_index = path_index
+        self.towers = towers  # Before the lanes, which block the tower cells in maze mode
+        self.set_lanes(lanes)
+        self.enemies = enemies
+        self.enemy_index.rebuild(enemies)
+        self.status_effects.rebuild(enemies)
+        self.spawn_queue = spawn_queue
+        self.schedule_towers(ready_towers)
+        self.impacts.clear()
+        self.hover_grid = None
+        self.last_rewind_time = sim_time
+    
+    def save_game(self):
+        self.autosave_writer.submit(self.save_state())
+        self.last_autosave_time = time.time()
+    
+    def load_game(self):
+        try:
+            with open(SAVE_FILE, "rb") as f:
+                self.load_state(f.read())
+        except (OSError, SnapshotError) as e:
+            print(f"Could not load save file: {e}")
+            return
+        # The rewind history belongs to the run that was replaced
+        self.rewind_buffer.clear()
+        self.rewind_cursor = None
+    
+    def capture_rewind(self):
+        self.rewind_buffer.capture(self.sim_time, self.save_state())
+        self.last_rewind_time = self.sim_time
+    
+    def scrub_rewind(self, step):
+        """Move through the rewind history while paused"""
+        if self.rewind_cursor is None:
+            # Keep the live state so scrubbing forward can return to it
+            self.capture_rewind()
+            self.rewind_cursor = len(self.rewind_buffer) - 1
+        cursor = max(0, min(len(self.rewind_buffer) - 1, self.rewind_cursor + step))
+        self.load_state(self.rewind_buffer.get(cursor))
+        self.rewind_cursor = cursor
+        self.game_state = "paused"
     
     def update(self):
+        self.step_simulation()
+        self.update_hover()
+    
+    def step_simulation(self):
+        """One simulation tick, timed for the endless mode readout"""
+        start = time.perf_counter()
+        self.update_simulation()
+        self.tick_time += (time.perf_counter() - start - self.tick_time) * 0.1
+    
+    def render_state(self):
+        """Snapshot of everything the world and HUD drawing needs"""
+        return FrameSnapshot(
+            tuple(tower.snapshot() for tower in self.towers),
+            tuple(enemy.snapshot() for enemy in self.enemies if enemy.alive),
+            tuple(projectile.snapshot() for tower in self.towers
+                  for projectile in tower.projectiles if projectile.active),
+            self.lanes, self.game_state, self.score, self.money, self.lives, self.wave,
+            self.current_path_index, self.wave_cleared())
+    
+    def update_simulation(self):
         if self.game_state != "playing":
             return
             
@@ -915,14 +1729,22 @@ class Game:
         elapsed_time = current_time - self.game_start_time
         
         # Check if time is up
-        if elapsed_time >= GAME_TIME_LIMIT:
+        if not self.endless and elapsed_time >= GAME_TIME_LIMIT:
             self.game_state = "game_over"
             return
         
+        self.sim_time += self.game_speed / FPS
+        
+        # Snapshots take well under a frame; the file write happens off the main thread
+        if self.recording and current_time - self.last_autosave_time >= AUTOSAVE_INTERVAL:
+            self.save_game()
+        if self.recording and self.sim_time - self.last_rewind_time >= REWIND_INTERVAL:
+            self.capture_rewind()
+        
         # Spawn waves
-        if current_time - self.last_wave_time > WAVE_DELAY / self.game_speed and len(self.enemies) == 0:
+        if self.sim_time - self.last_wave_time > WAVE_DELAY and self.wave_cleared():
             self.wave += 1
-            self.last_wave_time = current_time
+            self.last_wave_time = self.sim_time
             
             # Change path automatically after each wave if enabled
             if self.auto_change_path and self.wave > 1:
@@ -930,67 +1752,144 @@ class Game:
             
             # Calculate number of enemies for this wave
             num_enemies = self.get_enemies_in_wave(self.wave)
+            health_scale = self.get_health_scale(self.wave)
+            spawn_window = max(1, num_enemies / SPAWN_RATE)
             
             # Spawn enemies for this wave
             for i in range(num_enemies):
                 # Determine enemy type based on wave and position
                 enemy_type = self.get_enemy_type_for_wave(self.wave, i, num_enemies)
                 
-                enemy = Enemy(self.path, enemy_type, self.difficulty)
-                self.enemies.append(enemy)
-        
-        # Update enemies
-        for enemy in self.enemies[:]:
-            if enemy.spawn_delay > 0:
-                enemy.spawn_delay -= 1/FPS * self.game_speed
-                continue
-                
-            enemy.update(self.game_speed)
+                lane = i % len(self.lanes)  # Enemies take turns between the lanes
+                enemy = Enemy(self.lanes[lane], enemy_type, self.difficulty, lane)
+                if health_scale != 1.0:
+                    enemy.health = enemy.max_health = enemy.health * health_scale
+                enemy.offset = random.uniform(-1, 1)  # Tells apart enemies released on the same spot
+                self.spawn_queue.push(self.sim_time + random.uniform(0, spawn_window), enemy)
+        
+        # Release enemies whose spawn time has come
+        released = self.spawn_queue.pop_due(self.sim_time)
+        self.enemies.extend(released)
+        self.enemy_index.add(released)
+        
+        # Update enemies; effects first, so slows and burn kills count this tick
+        self.status_effects.tick(self.game_speed)
+        # Survivors are collected in one pass; removing each death from the list was quadratic in big waves
+        survivors = []
+        field = self.flow_field
+        if field is None:
+            # Maze enemies keep to the cell centres instead, clear of the towers
+            self.separation.apply(self.enemies, self.game_speed)
+        for enemy in self.enemies:
+            if field is None:
+                enemy.update(self.game_speed)
+            else:
+                enemy.follow_field(field, self.game_speed)
             
-            if not enemy.alive:
-                if enemy.path_index >= len(self.path) - 1:
-                    # Enemy reached the end
-                    self.lives -= 1
-                    if self.lives <= 0:
-                        self.game_state = "game_over"
-                else:
-                    # Enemy was killed
-                    self.score += enemy.reward
-                    self.money += enemy.reward // 2
-                
-                self.enemies.remove(enemy)
-        
-        # Update towers
+            if enemy.alive:
+                survivors.append(enemy)
+            elif enemy.path_index >= len(enemy.path) - 1:
+                # Enemy reached the end
+                self.lives -= 1
+                self.audio.play("life_lost")
+                if self.lives <= 0:
+                    self.game_state = "game_over"
+            else:
+                # Enemy was killed
+                self.score += enemy.reward
+                self.audio.play("enemy_death")
+                self.money += enemy.reward // 2
+        self.enemies = survivors
+        
+        # Update towers: projectiles move every tick, but only reloaded towers
+        # look for targets and fire
+        self.enemy_index.refresh()
+        landed = []
         for tower in self.towers:
-            tower.update(self.enemies, current_time, self.game_speed)
+            tower.update_projectiles(self.game_speed, landed)
+        for projectile in self.impacts.pop_due(self.sim_time):
+            if not projectile.target.alive:
+                continue
+            if not projectile.splash:
+                projectile.target.take_damage(projectile.damage)
+            if projectile.splash or projectile.effects:
+                landed.append(projectile)
+        # Splash damage from every shell this tick, centred where each target stands
+        self.enemy_index.apply_blasts([(shell.target, shell.splash, shell.damage)
+                                       for shell in landed if shell.splash])
+        for projectile in landed:
+            self.status_effects.apply(projectile.target, projectile.effects)
+        self.ready_towers.extend(self.reloading_towers.pop_due(self.sim_time))
+        
+        # Towers left waiting when the scan budget ran out go first next tick
+        self.target_scans = 0
+        waiting, idle = [], []
+        for tower in self.ready_towers:
+            if tower.retarget(self.enemy_index, self.target_scans < RETARGET_BUDGET):
+                self.target_scans += 1
+            elif tower.target is None and self.enemies:
+                waiting.append(tower)
+                continue
+            if tower.target:
+                projectile = tower.fire(self.sim_time, self.game_speed)
+                self.audio.play(tower.stats.shot_sound)
+                if projectile is None:
+                    pass  # Missed
+                elif self.analytic_projectiles:
+                    self.schedule_impact(projectile)
+                else:
+                    tower.projectiles.append(projectile)
+                self.reloading_towers.push(tower.ready_time, tower)
+            else:
+                idle.append(tower)
+        self.ready_towers = waiting + idle
         
         # Check victory condition
-        if self.wave >= 10 and len(self.enemies) == 0:
+        if not self.endless and self.wave >= 10 and self.wave_cleared():
             self.game_state = "victory"
             self.score += WAVE_BONUS
+    
+    def schedule_impact(self, projectile):
+        # Shots at targets that escape first never land, like a stepped projectile
+        flight_time = projectile.time_to_impact(self.flow_field)
+        if flight_time is not None:
+            self.impacts.push(self.sim_time + flight_time, projectile)
+    
+    def run_headless(self, max_ticks=HEADLESS_TICKS):
+        """Batch mode: simulate without drawing or input until the game ends"""
+        self.analytic_projectiles = True
+        self.recording = False
+        if self.game_state == "paused":
+            self.game_state = "playing"
+        start = time.perf_counter()
+        ticks = 0
+        # The time limit runs on the wall clock, which a batch run barely
+        # moves, so here each tick uses up one frame of the time left
+        clock_ticks = None
+        if not self.endless:
+            clock_ticks = max(0, math.ceil((GAME_TIME_LIMIT - (time.time() - self.game_start_time)) * FPS))
+            max_ticks = min(max_ticks, clock_ticks)
+        while self.game_state == "playing" and ticks < max_ticks:
+            self.update_simulation()
+            ticks += 1
+        if self.game_state == "playing" and ticks == clock_ticks:
+            self.game_state = "game_over"  # Time is up
+        print(f"{self.game_state}: wave {self.wave}, score {self.score:.0f}, lives {self.lives} after "
+              f"{ticks} ticks ({self.sim_time:.0f} simulated s) in {time.perf_counter() - start:.2f} s")
+    
+    def update_hover(self):
+        if self.game_state != "playing":
+            return
         
         # Update hover position
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        if mouse_x < GAME_FIELD_WIDTH:  # Only in game field area
+        world_pos = self.viewport.screen_to_world(pygame.mouse.get_pos())
+        if world_pos is not None:  # Only in game field area
+            mouse_x, mouse_y = world_pos
             grid_x = mouse_x // GRID_SIZE
             grid_y = mouse_y // GRID_SIZE
             
             # Check if hover position is valid
-            valid_hover = True
-            for i in range(len(self.path) - 1):
-                x1, y1 = self.path[i]
-                x2, y2 = self.path[i + 1]
-                
-                cell_x = grid_x * GRID_SIZE + GRID_SIZE // 2
-                cell_y = grid_y * GRID_SIZE + GRID_SIZE // 2
-                
-                dist_to_segment = self.point_to_line_distance(
-                    (cell_x, cell_y), (x1, y1), (x2, y2)
-                )
-                
-                if dist_to_segment < PATH_WIDTH / 2 + GRID_SIZE:
-                    valid_hover = False
-                    break
+            valid_hover = (grid_x, grid_y) not in self.blocked_cells
             
             tower_cost = TOWER_SETTINGS[self.selected_tower_type]["cost"]
             if valid_hover and self.money >= tower_cost:
@@ -1000,76 +1899,142 @@ class Game:
         else:
             self.hover_grid = None
     
-    def draw(self):
-        # Draw background
-        self.screen.fill(GREEN)
-        
-        # Draw game field area
-        # game_field_rect = pygame.Rect(0, 0, GAME_FIELD_WIDTH, SCREEN_HEIGHT)
-        # pygame.draw.rect(self.screen, GREEN, game_field_rect)
+    def render_background(self, background, area, scale):
+        """Grass and lanes for the background chunk covering the world rect ``area``"""
+        def to_chunk(point):
+            return ((point[0] - area.x) * scale, (point[1] - area.y) * scale)
+        background.fill(GREEN)
         
-        # Draw grass texture
-        # Draw grass texture tiled across screen
+        # Draw grass texture tiled from the world origin, so neighbouring chunks line up
         if self.grass_texture:
+            grass = self.grass_texture if scale == 1.0 else self.viewport.sprites.get("grass", self.grass_texture, scale)
             w, h = self.grass_texture.get_size()
-            for x in range(0, GAME_FIELD_WIDTH, w):
-                for y in range(0, SCREEN_HEIGHT, h):
-                    self.screen.blit(self.grass_texture, (x, y))
-
-        # Fallback to original road drawing
-        for i in range(len(self.path) - 1):
-            start = self.path[i]
-            end = self.path[i + 1]
-        
+            for x in range(area.left // w * w, area.right, w):
+                for y in range(area.top // h * h, area.bottom, h):
+                    background.blit(grass, to_chunk((x, y)))
+        
+        # Draw the road: only segments reaching into the chunk, and borders of
+        # every lane first, so shared stretches don't get seams
+        reach = area.inflate(PATH_WIDTH + 4, PATH_WIDTH + 4)
+        segments = [(to_chunk(start), to_chunk(end)) for path in self.background_lanes
+                    for start, end in zip(path, path[1:]) if reach.clipline(start, end) and not self.maze]
+        for start, end in segments:
             # Draw path border (slightly wider than the road itself)
-            pygame.draw.line(self.screen, DARK_BROWN, start, end, PATH_WIDTH + 4)
+            draw_band(background, DARK_BROWN, start, end, round((PATH_WIDTH + 4) * scale))
+        for start, end in segments:
             # Draw main path
-            pygame.draw.line(self.screen, BROWN, start, end, PATH_WIDTH)
-        
-            # Border around waypoints
-            # pygame.draw.circle(self.screen, DARK_BROWN, (int(start[0]), int(start[1])), PATH_WIDTH // 2 + 2)
+            draw_band(background, BROWN, start, end, round(PATH_WIDTH * scale))
             # Main waypoint
-            pygame.draw.circle(self.screen, BROWN, (int(start[0]), int(start[1])), PATH_WIDTH // 2)
+            pygame.draw.circle(background, BROWN, start, PATH_WIDTH // 2 * scale)
         
-        # Draw end point with border
-        end_point = self.path[-1]
-        # pygame.draw.circle(self.screen, DARK_BROWN, (int(end_point[0]), int(end_point[1])), PATH_WIDTH // 2 + 2)
-        pygame.draw.circle(self.screen, BROWN, (int(end_point[0]), int(end_point[1])), PATH_WIDTH // 2)
+        # Draw end points; in maze mode the entrances too, as there is no road
+        for path in self.background_lanes:
+            for point in (path[0], path[-1]) if self.maze else (path[-1],):
+                pygame.draw.circle(background, BROWN, to_chunk(point), PATH_WIDTH // 2 * scale)
+    
+    def draw(self, frame=None):
+        # Frames come from the simulation thread in threaded mode, otherwise capture one now
+        if frame is None:
+            frame = self.render_state()
+        
+        # Draw the game field into the viewport surface
+        view = self.viewport
+        world = view.surface
+        self.background_lanes = frame.lanes
+        self.background.invalidate((id(frame.lanes), view.scale))
+        self.background.draw(view, world)
 
         
         # Draw hover effect
         if self.hover_grid:
             grid_x, grid_y = self.hover_grid
-            center_x = grid_x * GRID_SIZE + GRID_SIZE // 2
-            center_y = grid_y * GRID_SIZE + GRID_SIZE // 2
-            pygame.draw.circle(self.screen, PURPLE, (center_x, center_y), GRID_SIZE // 2, 2)
+            center = view.to_screen(grid_x * GRID_SIZE + GRID_SIZE // 2, grid_y * GRID_SIZE + GRID_SIZE // 2)
+            pygame.draw.circle(world, PURPLE, center, view.length(GRID_SIZE // 2), 2)
             
             # Draw tower preview
             tower_color = TOWER_SETTINGS[self.selected_tower_type]["color"]
-            pygame.draw.circle(self.screen, tower_color, (center_x, center_y), 15, 2)
-        
-        # Draw towers
-        for tower in self.towers:
-            tower.draw(self.screen)
+            pygame.draw.circle(world, tower_color, center, view.length(15), 2)
+        
+        # Only what is in view gets drawn, and the detail level follows that count
+        visible = view.visible_rect.inflate(2 * CULL_MARGIN, 2 * CULL_MARGIN)
+        towers = [tower for tower in frame.towers if tower.selected or visible.collidepoint(tower.x, tower.y)]
+        enemies = [enemy for enemy in frame.enemies if visible.collidepoint(enemy.x, enemy.y)]
+        projectiles = [projectile for projectile in frame.projectiles
+                       if visible.collidepoint(projectile.x, projectile.y)]
+        
+        # Queue towers, projectiles and enemies, then draw them in one batched pass
+        detail = self.level_of_detail.update(len(towers) + len(enemies) + len(projectiles))
+        batch = self.sprite_batch
+        for tower in towers:
+            Tower.draw(batch, view, tower, detail)
+        if detail == LevelOfDetail.MINIMAL:
+            Projectile.draw_merged(batch, view, projectiles)
+        else:
+            for projectile in projectiles:
+                Projectile.draw(batch, view, projectile)
+        for enemy in enemies:
+            Enemy.draw(batch, view, enemy, detail)
+        self.blit_count = len(batch)
+        batch.flush(world)
         
-        # Draw enemies
-        for enemy in self.enemies:
-            enemy.draw(self.screen)
+        # Stretch the field to the window
+        view.present()
         
         # Draw UI
-        self.draw_ui()
+        self.draw_ui(frame)
+        
+        if self.show_debug:
+            self.draw_debug_overlay(frame)
+        if self.endless:
+            self.draw_stress_readout(frame)
         
         # Draw pause overlay if game is paused
-        if self.game_state == "paused":
+        if frame.game_state == "paused":
             self.draw_pause_overlay()
         
         # Draw game over or victory screen
-        if self.game_state == "game_over":
-            self.draw_game_over()
-        elif self.game_state == "victory":
-            self.draw_victory()
+        if frame.game_state == "game_over":
+            self.draw_game_over(frame)
+        elif frame.game_state == "victory":
+            self.draw_victory(frame)
         
         pygame.display.flip()
+    def draw_stress_readout(self, frame):
+        # Live entity counts and timings for finding where large waves get slow
+        text = (f"Enemies: {len(frame.enemies)}  Towers: {len(frame.towers)}  "
+                f"Projectiles: {len(frame.projectiles)}  Frame: {self.level_of_detail.average * 1000:.1f} ms  "
+                f"Tick: {self.tick_time * 1000:.1f} ms")
+        readout = self.small_font.render(text, True, WHITE)
+        rect = readout.get_rect(topright=(GAME_FIELD_WIDTH - 10, 90)).inflate(16, 10)
+        pygame.draw.rect(self.screen, BLACK, rect)
+        pygame.draw.rect(self.screen, GRAY, rect, 1)
+        self.screen.blit(readout, readout.get_rect(center=rect.center))
+    
+    def draw_debug_overlay(self, frame):
+        lod = self.level_of_detail
+        sprites = self.viewport.sprites
+        audio = self.audio
+        entities = len(frame.towers) + len(frame.enemies) + len(frame.projectiles)
+        lines = [
+            f"FPS: {self.clock.get_fps():.0f}  Frame: {lod.average * 1000:.1f} ms",
+            f"Entities: {entities}  Blits: {self.blit_count}",
+            f"Target scans: {self.target_scans}/tick (budget {RETARGET_BUDGET})",
+            f"Status effects: {len(self.status_effects)} enemies",
+            f"Detail: {LevelOfDetail.NAMES[lod.level]}" + (" (over budget)" if lod.over_budget else ""),
+            f"Detail drops at: {', '.join(str(t) for t in lod.entity_thresholds)} entities, "
+            f"{lod.frame_budget * 1000:.1f} ms",
+            f"Render: {self.viewport.render_scale:.0%}  Zoom: {self.viewport.zoom:.0%}",
+            f"Sprites: {len(sprites)} cached, {sprites.pixels / 1e6:.1f} MP, "
+            f"{sprites.misses} built, {sprites.evictions} evicted",
+            f"Audio: {audio.played} played, {audio.dropped} dropped, {audio.busy()}/{len(audio.channels)} busy"
+            if audio.enabled else "Audio: off",
+        ]
+        rect = pygame.Rect(10, 90, 370, 10 + 22 * len(lines))
+        pygame.draw.rect(self.screen, BLACK, rect)
+        pygame.draw.rect(self.screen, GRAY, rect, 1)
+        for i, line in enumerate(lines):
+            self.screen.blit(self.small_font.render(line, True, WHITE), (20, 97 + 22 * i))
+    
     def draw_pause_overlay(self):
         overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         overlay.set_alpha(128)
@@ -1085,8 +2050,20 @@ class Game:
         inst_text = self.font.render("Press P to resume", True, WHITE)
         inst_rect = inst_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
         self.screen.blit(inst_text, inst_rect)
+        
+        # Draw rewind status
+        if len(self.rewind_buffer) > 0:
+            if self.rewind_cursor is None:
+                rewound = 0
+            else:
+                rewound = self.rewind_buffer.time_at(-1) - self.rewind_buffer.time_at(self.rewind_cursor)
+            rewind_text = self.small_font.render(
+                f"[ / ]: Rewind ({rewound:.0f}s back, {len(self.rewind_buffer)} snapshots, "
+                f"{self.rewind_buffer.memory_usage() / 1024:.0f} KB)", True, WHITE)
+            rewind_rect = rewind_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 90))
+            self.screen.blit(rewind_text, rewind_rect)
     
-    def draw_ui(self):
+    def draw_ui(self, frame):
         # Draw top bar over game field only
         top_bar_rect = pygame.Rect(0, 0, GAME_FIELD_WIDTH, 80)
         pygame.draw.rect(self.screen, (0, 0, 0, 180), top_bar_rect)
@@ -1102,41 +2079,44 @@ class Game:
         pygame.draw.rect(self.screen, GOLD, stats_rect, 2)
         
         # Draw score
-        score_text = self.font.render(f"Score: {self.score}", True, WHITE)
+        score_text = self.font.render(f"Score: {frame.score}", True, WHITE)
         self.screen.blit(score_text, (20, 50))
         
         # Draw money with coin icon
         pygame.draw.circle(self.screen, GOLD, (220, 60), 10)
-        money_text = self.font.render(f"${self.money}", True, YELLOW)
+        money_text = self.font.render(f"${frame.money}", True, YELLOW)
         self.screen.blit(money_text, (235, 50))
         
         # Draw lives with heart icon
         pygame.draw.circle(self.screen, RED, (370, 60), 8)
         pygame.draw.polygon(self.screen, RED, [(370, 60), (365, 55), (365, 65)])
         pygame.draw.polygon(self.screen, RED, [(370, 60), (375, 55), (375, 65)])
-        lives_text = self.font.render(f"Lives: {self.lives}", True, RED)
+        lives_text = self.font.render(f"Lives: {frame.lives}", True, RED)
         self.screen.blit(lives_text, (385, 50))
         
         # Draw wave
-        wave_text = self.font.render(f"Wave: {self.wave}/10", True, WHITE)
+        wave_text = self.font.render(f"Wave: {frame.wave}" if self.endless else f"Wave: {frame.wave}/10", True, WHITE)
         self.screen.blit(wave_text, (500, 50))
         
         # Draw timer
         elapsed_time = time.time() - self.game_start_time
         remaining_time = max(0, GAME_TIME_LIMIT - elapsed_time)
+        if self.endless:
+            # No time limit, so the timer counts up
+            remaining_time = elapsed_time
         minutes = int(remaining_time // 60)
         seconds = int(remaining_time % 60)
-        timer_color = RED if remaining_time < 60 else WHITE
+        timer_color = RED if remaining_time < 60 and not self.endless else WHITE
         timer_text = self.font.render(f"{minutes:02d}:{seconds:02d}", True, timer_color)
         self.screen.blit(timer_text, (650, 50))
         
         # Draw current path indicator
-        path_text = self.font.render(f"Path: {self.current_path_index + 1}/50", True, WHITE)
+        path_text = self.font.render(f"Path: {frame.path_index + 1}/{len(self.all_maps)}", True, WHITE)
         self.screen.blit(path_text, (800, 50))
         
         # Draw next wave enemy count
-        if self.game_state == "playing" and len(self.enemies) == 0:
-            next_wave_enemies = self.get_enemies_in_wave(self.wave + 1) if self.wave < 10 else 0
+        if frame.game_state == "playing" and frame.wave_cleared:
+            next_wave_enemies = self.get_enemies_in_wave(frame.wave + 1) if frame.wave < 10 or self.endless else 0
             next_wave_text = self.font.render(f"Next: {next_wave_enemies} enemies", True, YELLOW)
             self.screen.blit(next_wave_text, (1000, 50))
         
@@ -1228,25 +2208,48 @@ class Game:
         # Draw action buttons
         self.pause_button.draw(self.screen)
         
+        # Draw minimap: the map background is rendered once per path, the dots every few frames
+        minimap = self.minimap
+        minimap.set_background(id(frame.lanes), self.render_background)
+        if minimap.due():
+            tower_dots = {}
+            for tower in frame.towers:
+                tower_dots.setdefault(tower.color, []).append((tower.x, tower.y))
+            minimap.plot([(RED, 2, ((enemy.x, enemy.y) for enemy in frame.enemies))] +
+                         [(color, 4, positions) for color, positions in tower_dots.items()])
+        minimap.draw(self.screen, self.viewport, WHITE)
+        pygame.draw.rect(self.screen, GRAY, minimap.rect.inflate(2, 2), 1)
+        
         # Draw instructions
         instructions = [
             "1/2/3: Select Tower",
             "Click: Place/Upgrade",
+            "X: Sell Tower",
             "C: Change Path",
-            "P: Pause",
+            "P/ESC: Pause/Exit",
+            "WASD/Wheel: Scroll/Zoom Map",
             "↑/↓: Change Speed",
             "+/-: Change Difficulty",
-            "ESC: Exit"
+            "F5/F9: Save/Load",
+            "[ / ]: Rewind (paused)",
+            "Right-click: Target Priority",
+            "F2/F3: Render Scale/Debug"
         ]
         
-        inst_y = 800
+        inst_y = 790
         for inst in instructions:
             inst_text = self.small_font.render(inst, True, WHITE)
             self.screen.blit(inst_text, (GAME_FIELD_WIDTH + 20, inst_y))
-            inst_y += 25
+            inst_y += 22
+        
+        # Draw render scale
+        scale_mode = " (auto)" if self.auto_render_scale else ""
+        scale_text = self.small_font.render(f"Render: {self.viewport.render_scale:.0%}{scale_mode}  "
+                                            f"Zoom: {self.viewport.zoom:.0%}", True, LIGHT_GRAY)
+        self.screen.blit(scale_text, (GAME_FIELD_WIDTH + 20, inst_y + 5))
         
         # Draw wave info panel
-        if self.game_state == "playing":
+        if frame.game_state == "playing":
             wave_info_rect = pygame.Rect(GAME_FIELD_WIDTH - 250, 100, 230, 120)
             pygame.draw.rect(self.screen, (0, 0, 0, 180), wave_info_rect)
             pygame.draw.rect(self.screen, GOLD, wave_info_rect, 2)
@@ -1256,27 +2259,27 @@ class Game:
             self.screen.blit(info_title, (GAME_FIELD_WIDTH - 240, 110))
             
             # Current wave enemies
-            current_enemies = self.get_enemies_in_wave(self.wave)
+            current_enemies = self.get_enemies_in_wave(frame.wave)
             current_text = self.small_font.render(f"Current: {current_enemies} enemies", True, WHITE)
             self.screen.blit(current_text, (GAME_FIELD_WIDTH - 240, 135))
             
             # Enemy composition
-            if self.wave < 3:
+            if frame.wave < 3:
                 comp_text = self.small_font.render("Composition: All Goblins", True, WHITE)
-            elif self.wave < 6:
+            elif frame.wave < 6:
                 comp_text = self.small_font.render("Composition: Goblins & Orcs", True, WHITE)
             else:
-                troll_pct = min(60, 20 + (self.wave - 5) * 10)
+                troll_pct = min(60, 20 + (frame.wave - 5) * 10)
                 comp_text = self.small_font.render(f"Composition: {troll_pct}% Trolls", True, WHITE)
             self.screen.blit(comp_text, (GAME_FIELD_WIDTH - 240, 160))
             
             # Next wave preview
-            if self.wave < 10:
-                next_enemies = self.get_enemies_in_wave(self.wave + 1)
+            if frame.wave < 10:
+                next_enemies = self.get_enemies_in_wave(frame.wave + 1)
                 next_text = self.small_font.render(f"Next wave: {next_enemies} enemies", True, YELLOW)
                 self.screen.blit(next_text, (GAME_FIELD_WIDTH - 240, 185))
     
-    def draw_game_over(self):
+    def draw_game_over(self, frame):
         overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         overlay.set_alpha(200)
         overlay.fill(BLACK)
@@ -1288,10 +2291,10 @@ class Game:
         game_over_text = self.title_font.render("GAME OVER", True, RED)
         text_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
         self.screen.blit(game_over_text, text_rect)
-        score_text = self.font.render(f"Final Score: {self.score}", True, WHITE)
+        score_text = self.font.render(f"Final Score: {frame.score}", True, WHITE)
         score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
         self.screen.blit(score_text, score_rect)
-        waves_completed_text = self.font.render(f"Waves Completed: {self.wave}/10", True, WHITE)
+        waves_completed_text = self.font.render(f"Waves Completed: {frame.wave}/10", True, WHITE)
         waves_rect = waves_completed_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
         self.screen.blit(waves_completed_text, waves_rect)
         # Changed this line to show restart option
@@ -1300,7 +2303,7 @@ class Game:
         self.screen.blit(restart_text, restart_rect)
     
     # Modify the draw_victory method
-    def draw_victory(self):
+    def draw_victory(self, frame):
         overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         overlay.set_alpha(200)
         overlay.fill(BLACK)
@@ -1312,7 +2315,7 @@ class Game:
         victory_text = self.title_font.render("VICTORY!", True, GOLD)
         text_rect = victory_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 70))
         self.screen.blit(victory_text, text_rect)
-        score_text = self.font.render(f"Final Score: {self.score}", True, WHITE)
+        score_text = self.font.render(f"Final Score: {frame.score}", True, WHITE)
         score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20))
         self.screen.blit(score_text, score_rect)
         bonus_text = self.small_font.render(f"Wave Bonus: +{WAVE_BONUS}", True, YELLOW)
@@ -1326,15 +2329,48 @@ class Game:
         restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100))
         self.screen.blit(restart_text, restart_rect)
     
+    def run_threaded(self):
+        """Desktop mode: the simulation ticks on its own thread while this loop renders"""
+        simulation = SimulationThread(self.step_simulation, self.render_state, FPS)
+        simulation.start()
+        while self.running:
+            # Input changes simulation state, so it runs between ticks
+            with simulation.lock:
+                self.handle_events()
+                self.update_hover()
+            # Timed from here: waiting for the lock is simulation time, and
+            # counting it would lower the render scale and detail for nothing
+            frame_start = time.perf_counter()
+            self.update_camera()
+            self.draw(simulation.frames.read())
+            self.record_frame_time(time.perf_counter() - frame_start)
+            self.clock.tick(FPS)
+        simulation.stop()
+    
     async def run(self):
+        if THREADED_SIMULATION:
+            self.run_threaded()
+            return
         while self.running:
+            frame_start = time.perf_counter()
             self.handle_events()
             self.update()
+            self.update_camera()
             self.draw()
+            self.record_frame_time(time.perf_counter() - frame_start)
             self.clock.tick(FPS)
             await asyncio.sleep(0) 
         
         pygame.quit()
-if __name__ == "__main__":
+async def main():
+    # Decode all sprites concurrently before the window opens
+    await decode_all(ASSET_SPECS)
     game = Game()
-    asyncio.run(game.run())
\ No newline at end of file
+    if HEADLESS:
+        game.load_game()  # Starts from a fresh game when there is no save
+        game.run_headless()
+        return
+    await game.run()
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""Memory report for game entities.
+
+Builds a batch of each entity kind under tracemalloc and prints the bytes
+each one adds. Per-type data (stats, sprites) is warmed up first, so the
+numbers are what every extra enemy, tower or projectile costs.
+
+    python memory_report.py [count] [module]
+"""
+import os
+import sys
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+DEFAULT_COUNT = 2000
+
+
+def measure(build, count):
+    """Average traced bytes per object returned by build()"""
+    build()  # Warm up per-type caches
+    objects = []
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    for _ in range(count):
+        objects.append(build())
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The list holding the batch is not part of the entities
+    return (end - start - sys.getsizeof(objects)) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    module = sys.argv[2] if len(sys.argv) > 2 else "main"
+    game = __import__(module)
+    pygame.display.set_mode((1, 1))
+    path = game.PathGenerator.generate_circular_path()
+    target = game.Enemy(path, "orc", 2)
+
+    rows = []
+    for enemy_type in game.ENEMY_TYPES:
+        rows.append((f"Enemy ({enemy_type})", measure(lambda: game.Enemy(path, enemy_type, 2), count)))
+    for tower_type in game.TowerType:
+        rows.append((f"Tower ({tower_type.name.lower()})", measure(lambda: game.Tower(100, 100, tower_type, 2), count)))
+    rows.append(("Projectile", measure(lambda: game.Projectile(100, 100, target, 20, 8, game.ARCHER_GREEN), count)))
+
+    print(f"Bytes per entity ({count} of each, {module}.py):")
+    for name, size in rows:
+        print(f"  {name:<18} {size:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import zlib
+from collections import deque
+
+
+def _xor(data, base):
+    # XOR through big ints is far faster than a per-byte Python loop
+    size = max(len(data), len(base))
+    return (int.from_bytes(data, "little") ^ int.from_bytes(base, "little")).to_bytes(size, "little")
+
+
+class _Group:
+    """A keyframe and the delta-encoded snapshots that follow it"""
+
+    def __init__(self, sim_time, data):
+        self.keyframe = data
+        self.packed_keyframe = zlib.compress(data, 1)
+        self.times = [sim_time]
+        self.deltas = []  # (length, compressed XOR against the keyframe)
+        self.size = len(self.packed_keyframe)
+
+    def add(self, sim_time, data):
+        delta = zlib.compress(_xor(data, self.keyframe), 1)
+        self.times.append(sim_time)
+        self.deltas.append((len(data), delta))
+        self.size += len(delta)
+
+    def get(self, index):
+        keyframe = zlib.decompress(self.packed_keyframe)
+        if index == 0:
+            return keyframe
+        length, delta = self.deltas[index - 1]
+        return _xor(zlib.decompress(delta), keyframe)[:length]
+
+    def seal(self):
+        # Only the newest group needs the raw keyframe for encoding
+        self.keyframe = None
+
+
+class RewindBuffer:
+    """Bounded ring buffer of game snapshots for scrubbing back through play.
+
+    Every ``keyframe_interval``-th snapshot is stored whole; the ones in
+    between are XOR deltas against their keyframe, which compress to a
+    fraction of a full snapshot. The oldest keyframe group is evicted once
+    either ``max_snapshots`` or ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, max_snapshots=300, max_bytes=4 * 1024 * 1024, keyframe_interval=10):
+        self.max_snapshots = max_snapshots
+        self.max_bytes = max_bytes
+        self.keyframe_interval = keyframe_interval
+        self._groups = deque()
+        self._count = 0
+        self._size = 0
+
+    def capture(self, sim_time, data):
+        group = self._groups[-1] if self._groups else None
+        if group is None or len(group.times) >= self.keyframe_interval:
+            if group is not None:
+                group.seal()
+            group = _Group(sim_time, data)
+            self._groups.append(group)
+            self._size += group.size
+        else:
+            before = group.size
+            group.add(sim_time, data)
+            self._size += group.size - before
+        self._count += 1
+
+        # Never evict the group currently being written
+        while len(self._groups) > 1 and (self._count > self.max_snapshots or self._size > self.max_bytes):
+            oldest = self._groups.popleft()
+            self._count -= len(oldest.times)
+            self._size -= oldest.size
+
+    def _locate(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("rewind index out of range")
+        for group in self._groups:
+            if index < len(group.times):
+                return group, index
+            index -= len(group.times)
+
+    def get(self, index):
+        """Snapshot bytes at ``index`` (0 is the oldest, -1 the newest)"""
+        group, offset = self._locate(index)
+        return group.get(offset)
+
+    def time_at(self, index):
+        group, offset = self._locate(index)
+        return group.times[offset]
+
+    def truncate_after(self, index):
+        """Drop every snapshot newer than ``index``, e.g. when play resumes from it"""
+        keep = (index % self._count) + 1 if self._count else 0
+        while self._count > keep:
+            group = self._groups[-1]
+            drop = min(len(group.times), self._count - keep)
+            if drop == len(group.times):
+                self._groups.pop()
+                self._size -= group.size
+            else:
+                for _ in range(drop):
+                    group.times.pop()
+                    self._size -= len(group.deltas.pop()[1])
+                group.size = len(group.packed_keyframe) + sum(len(d) for _, d in group.deltas)
+            self._count -= drop
+        # The newest group must keep its raw keyframe to accept more deltas
+        if self._groups and self._groups[-1].keyframe is None:
+            self._groups[-1].keyframe = self._groups[-1].get(0)
+
+    def clear(self):
+        self._groups.clear()
+        self._count = 0
+        self._size = 0
+
+    def memory_usage(self):
+        """Bytes held by the buffer, including the raw keyframe kept for encoding"""
+        raw = self._groups[-1].keyframe if self._groups else None
+        return self._size + (len(raw) if raw else 0)
+
+    def __len__(self):
+        return self._count
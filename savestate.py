@@ -0,0 +1,138 @@
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+# Snapshot layout: header (magic, version, crc32 of payload) followed by a
+# little-endian payload of struct-packed records and array-packed blocks.
+MAGIC = b"FPSV"
+FORMAT_VERSION = 10
+HEADER = struct.Struct("<4sHI")
+
+# The browser build has no threads, so file writes happen inline there
+IS_WEB = sys.platform == "emscripten"
+
+
+class SnapshotError(ValueError):
+    """Raised when snapshot bytes are truncated, corrupt or from another version"""
+
+
+class SnapshotWriter:
+    def __init__(self):
+        self._parts = []
+
+    def pack(self, fmt, *values):
+        self._parts.append(struct.pack("<" + fmt, *values))
+
+    def floats(self, values):
+        self.pack("I", len(values))
+        self._parts.append(array("d", values).tobytes())
+
+    def uints(self, values):
+        block = array("I", values)
+        self.pack("I", len(block))
+        self._parts.append(block.tobytes())
+
+    def getvalue(self):
+        payload = b"".join(self._parts)
+        return HEADER.pack(MAGIC, FORMAT_VERSION, zlib.crc32(payload)) + payload
+
+
+class SnapshotReader:
+    def __init__(self, data):
+        if len(data) < HEADER.size:
+            raise SnapshotError("snapshot is truncated")
+        magic, version, checksum = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise SnapshotError("not a Forest Protector snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"unsupported snapshot version {version}")
+        self._view = memoryview(data)[HEADER.size:]
+        if zlib.crc32(self._view) != checksum:
+            raise SnapshotError("snapshot checksum mismatch")
+        self._offset = 0
+
+    def unpack(self, fmt):
+        fmt = struct.Struct("<" + fmt)
+        try:
+            values = fmt.unpack_from(self._view, self._offset)
+        except struct.error as e:
+            raise SnapshotError(f"snapshot is truncated: {e}")
+        self._offset += fmt.size
+        return values
+
+    def _block(self, typecode):
+        count, = self.unpack("I")
+        block = array(typecode)
+        end = self._offset + count * block.itemsize
+        if end > len(self._view):
+            raise SnapshotError("snapshot is truncated")
+        block.frombytes(self._view[self._offset:end])
+        self._offset = end
+        return block
+
+    def floats(self):
+        return self._block("d")
+
+    def uints(self):
+        return self._block("I")
+
+
+def pack_rng_state(writer, state):
+    # random.getstate() -> (version, 625 uint32 words, gauss_next)
+    version, words, gauss_next = state
+    writer.pack("B?d", version, gauss_next is not None, gauss_next or 0.0)
+    writer.uints(words)
+
+
+def unpack_rng_state(reader):
+    version, has_gauss, gauss_next = reader.unpack("B?d")
+    words = tuple(reader.uints())
+    return version, words, gauss_next if has_gauss else None
+
+
+def write_snapshot_file(path, data):
+    # Write to a temporary file first so a crash never leaves a half-written save
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class AutosaveWriter:
+    """Writes snapshot bytes to disk off the main thread on desktop builds.
+
+    Only the latest pending snapshot is kept; an older one still waiting to
+    be written is simply replaced.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pending = None
+        self._busy = False
+        self._lock = threading.Lock()
+
+    def submit(self, data):
+        if IS_WEB:
+            write_snapshot_file(self.path, data)
+            return
+        with self._lock:
+            self._pending = data
+            if self._busy:
+                return
+            self._busy = True
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                data, self._pending = self._pending, None
+                if data is None:
+                    self._busy = False
+                    return
+            try:
+                write_snapshot_file(self.path, data)
+            except OSError as e:
+                print(f"Autosave failed: {e}")
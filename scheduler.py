@@ -0,0 +1,47 @@
+import heapq
+import itertools
+
+
+class EventQueue:
+    """Items ordered by the simulation time they become due.
+
+    Waiting items live only in the heap, so they cost nothing per tick
+    until ``pop_due`` releases them.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()  # Tie-breaker keeps FIFO order for equal times
+
+    def push(self, due_time, item):
+        heapq.heappush(self._heap, (due_time, next(self._counter), item))
+
+    def pop_due(self, now):
+        """Remove and return every item whose due time has been reached."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def next_time(self):
+        return self._heap[0][0] if self._heap else None
+
+    def items(self):
+        """(due_time, item) pairs in release order."""
+        return [(due_time, item) for due_time, _, item in sorted(self._heap)]
+
+    def clear(self):
+        self._heap.clear()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __iter__(self):
+        return (item for _, _, item in self._heap)
+
+
+class SpawnQueue(EventQueue):
+    """Enemies waiting to enter the field, ordered by spawn time.
+
+    Waiting enemies are not visible to towers until ``pop_due`` releases them.
+    """
@@ -0,0 +1,104 @@
+from targeting import NeighbourGrid
+
+
+class Separation:
+    """Spreads enemies that share a road across its width.
+
+    Enemies on a lane all walk its centre line. Every tick each enemy is
+    nudged sideways, away from the enemies within ``radius`` of it, by
+    changing only its ``offset`` from the centre line; how far along the
+    path it is, which targeting and splash work from, is left alone.
+    Neighbours come from a grid of ``radius``-sized cells and at most
+    ``max_checks`` of them are looked at per enemy. A ``radius``-long
+    stretch of lane holding more enemies than that is too crowded for
+    pairwise pushes to spread, so its enemies instead move towards evenly
+    spaced offsets in their current order. Either way a pass stays linear
+    in the enemy count even when a whole wave is bunched up. A pass runs
+    every ``interval`` ticks and moves the offsets that many ticks' worth.
+    """
+
+    def __init__(self, radius, max_offset, speed, interval=1, max_checks=8):
+        self.radius = radius
+        self.max_offset = max_offset
+        self.speed = speed  # Sideways pixels per tick at full overlap
+        self.interval = interval
+        self.max_checks = max_checks
+        self.grid = NeighbourGrid(radius)
+        self.ticks = 0
+
+    def apply(self, enemies, game_speed):
+        self.ticks += 1
+        if self.ticks < self.interval:
+            return
+        self.ticks = 0
+        step = self.speed * game_speed * self.interval
+        if step <= 0:
+            return
+        limit = self.max_offset
+        radius = self.radius
+        max_checks = self.max_checks + 1  # The enemy itself is among its neighbours
+        # Every move is worked out before any offset changes, so the result
+        # doesn't depend on the order of ``enemies``
+        pushes = []
+        # Enemies on the same stretch of the same lane compete for its width
+        stretches = {}
+        for enemy in enemies:
+            key = (enemy.lane, enemy.path_index, int(enemy.progress // radius))
+            if key in stretches:
+                stretches[key].append(enemy)
+            else:
+                stretches[key] = [enemy]
+        loose = []
+        for stretch in stretches.values():
+            if len(stretch) <= max_checks:
+                loose.extend(stretch)
+                continue
+            # Crowded: the n enemies head for n even slots across the road,
+            # lowest offset to the lowest slot
+            stretch.sort(key=_offset)
+            spacing = 2 * limit / len(stretch)
+            for rank, enemy in enumerate(stretch):
+                gap = -limit + (rank + 0.5) * spacing - enemy.offset
+                if gap:
+                    pushes.append((enemy, gap / step))
+        self.grid.rebuild(loose)
+        cells = self.grid.cells
+        reach = radius * radius
+        for (cell_x, cell_y), members in cells.items():
+            if len(members) > max_checks:
+                # Each enemy looks at the cell-mates listed around it, which
+                # were filed from the same stretches of road
+                last_start = len(members) - max_checks
+                candidates = [(enemy, members[start:start + max_checks]) for index, enemy in enumerate(members)
+                              for start in (min(max(0, index - max_checks // 2), last_start),)]
+            else:
+                # One list serves every enemy in the cell: its own members
+                # first, then the surrounding cells' up to the cap
+                nearby = list(members)
+                for key in ((cell_x - 1, cell_y - 1), (cell_x, cell_y - 1), (cell_x + 1, cell_y - 1),
+                            (cell_x - 1, cell_y), (cell_x + 1, cell_y),
+                            (cell_x - 1, cell_y + 1), (cell_x, cell_y + 1), (cell_x + 1, cell_y + 1)):
+                    if key in cells:
+                        nearby.extend(cells[key])
+                        if len(nearby) >= max_checks:
+                            del nearby[max_checks:]
+                            break
+                candidates = [(enemy, nearby) for enemy in members]
+            for enemy, nearby in candidates:
+                x, y, offset = enemy.x, enemy.y, enemy.offset
+                push = 0.0
+                for other in nearby:
+                    distance_squared = (other.x - x) ** 2 + (other.y - y) ** 2
+                    if distance_squared >= reach or other.offset == offset:
+                        continue
+                    # Closer neighbours push harder
+                    weight = 1 - distance_squared / reach
+                    push += weight if offset > other.offset else -weight
+                if push:
+                    pushes.append((enemy, push))
+        for enemy, push in pushes:
+            enemy.offset = max(-limit, min(limit, enemy.offset + max(-1.0, min(1.0, push)) * step))
+
+
+def _offset(enemy):
+    return enemy.offset
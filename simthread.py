@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class DoubleBuffer:
+    """Two slots holding immutable frames.
+
+    The writer fills the back slot and then flips which slot is in front, so
+    a reader always gets a complete frame without taking a lock.
+    """
+
+    def __init__(self, initial=None):
+        self._slots = [initial, initial]
+        self._front = 0
+
+    def publish(self, frame):
+        back = 1 - self._front
+        self._slots[back] = frame
+        self._front = back  # A single reference store, atomic under the GIL
+
+    def read(self):
+        return self._slots[self._front]
+
+
+class SimulationThread:
+    """Runs ``step`` at a fixed tick rate on its own thread and publishes
+    ``snapshot()`` after every tick.
+
+    Code on other threads that mutates simulation state must hold ``lock``.
+    """
+
+    def __init__(self, step, snapshot, tick_rate):
+        self.step = step
+        self.snapshot = snapshot
+        self.interval = 1 / tick_rate
+        self.lock = threading.Lock()
+        self.frames = DoubleBuffer(snapshot())
+        self.ticks = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            with self.lock:
+                self.step()
+                frame = self.snapshot()
+            self.frames.publish(frame)
+            self.ticks += 1
+
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            elif delay < -5 * self.interval:
+                # Too far behind to catch up; drop the backlog instead of spiralling
+                next_tick = time.perf_counter()
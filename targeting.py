@@ -0,0 +1,309 @@
+import math
+from bisect import bisect_left, bisect_right
+from enum import Enum
+
+
+class TargetPriority(Enum):
+    NEAREST = 1
+    FIRST = 2  # Furthest along the path
+    LAST = 3
+    STRONGEST = 4
+    WEAKEST = 5
+    FASTEST = 6
+
+    @property
+    def label(self):
+        return self.name.capitalize()
+
+    def next(self):
+        members = list(TargetPriority)
+        return members[(members.index(self) + 1) % len(members)]
+
+
+def path_offsets(path):
+    """Arc length from the start of ``path`` to each of its waypoints"""
+    offsets = [0.0]
+    for (x1, y1), (x2, y2) in zip(path, path[1:]):
+        offsets.append(offsets[-1] + math.hypot(x2 - x1, y2 - y1))
+    return offsets
+
+
+def coverage_intervals(path, offsets, x, y, radius):
+    """Sorted, merged arc-length intervals of ``path`` inside the circle at (x, y).
+
+    Enemies only ever stand on the path, so an enemy is in range exactly when
+    its arc-length position falls in one of these intervals.
+    """
+    intervals = []
+    for index, ((x1, y1), (x2, y2)) in enumerate(zip(path, path[1:])):
+        length = offsets[index + 1] - offsets[index]
+        fx, fy = x1 - x, y1 - y
+        if length == 0:
+            if fx * fx + fy * fy <= radius * radius:
+                intervals.append((offsets[index], offsets[index]))
+            continue
+        # Points at distance s along the segment are in range where
+        # s^2 + 2*along*s + (|f|^2 - r^2) <= 0
+        along = (fx * (x2 - x1) + fy * (y2 - y1)) / length
+        discriminant = along * along - (fx * fx + fy * fy - radius * radius)
+        if discriminant < 0:
+            continue
+        root = math.sqrt(discriminant)
+        start, end = max(0.0, -along - root), min(length, -along + root)
+        if start > end:
+            continue
+        start, end = offsets[index] + start, offsets[index] + end
+        if intervals and start <= intervals[-1][1]:
+            intervals[-1] = (intervals[-1][0], max(intervals[-1][1], end))
+        else:
+            intervals.append((start, end))
+    return intervals
+
+
+# Scores for the priorities that pick the best enemy in range; higher wins
+PRIORITY_SCORES = {
+    TargetPriority.STRONGEST: lambda enemy: enemy.health,
+    TargetPriority.WEAKEST: lambda enemy: -enemy.health,
+    TargetPriority.FASTEST: lambda enemy: enemy.speed,
+}
+
+
+class EnemyIndex:
+    """Enemies ordered by arc-length position on the path.
+
+    Re-sorted once per tick for all towers together. The list is kept
+    between ticks, so the sort gets nearly sorted input and runs close to
+    linear time. ``arcs`` holds the ascending positions that match
+    ``by_arc``, so the enemies inside an arc-length interval are a binary
+    search away.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.offsets = []
+        self.by_arc = []  # Nearest the start first
+        self.arcs = []
+
+    def set_path(self, path):
+        self.path = path
+        self.offsets = path_offsets(path)
+
+    def arc(self, enemy):
+        """Distance the enemy has covered along the path"""
+        return self.offsets[min(enemy.path_index, len(self.offsets) - 1)] + enemy.progress
+
+    def add(self, enemies):
+        self.by_arc.extend(enemies)
+
+    def refresh(self):
+        """Drop dead enemies and restore the order after everyone moved"""
+        alive = [enemy for enemy in self.by_arc if enemy.alive]
+        # Each position is computed once and reused for both the sort and ``arcs``
+        arcs = list(map(self.arc, alive))
+        order = sorted(range(len(alive)), key=arcs.__getitem__)
+        self.by_arc = [alive[i] for i in order]
+        self.arcs = [arcs[i] for i in order]
+
+    def rebuild(self, enemies):
+        self.by_arc = list(enemies)
+        self.refresh()
+
+    @property
+    def length(self):
+        return self.offsets[-1]
+
+    def span(self, start, end):
+        """Slice bounds of ``by_arc`` for enemies between two arc lengths"""
+        return bisect_left(self.arcs, start), bisect_right(self.arcs, end)
+
+    def first_in(self, intervals):
+        """Live enemy furthest along inside the sorted ``intervals``, or None"""
+        by_arc = self.by_arc
+        for start, end in reversed(intervals):
+            low, high = self.span(start, end)
+            for i in range(high - 1, low - 1, -1):
+                if by_arc[i].alive:
+                    return by_arc[i]
+        return None
+
+    def last_in(self, intervals):
+        """Live enemy least far along inside the sorted ``intervals``, or None"""
+        by_arc = self.by_arc
+        for start, end in intervals:
+            low, high = self.span(start, end)
+            for i in range(low, high):
+                if by_arc[i].alive:
+                    return by_arc[i]
+        return None
+
+    def live_in(self, intervals):
+        """Every live enemy inside ``intervals``"""
+        by_arc = self.by_arc
+        return (enemy for start, end in intervals
+                for enemy in by_arc[slice(*self.span(start, end))] if enemy.alive)
+
+    def apply_blasts(self, blasts):
+        """Damage every live enemy within ``radius`` path length of each
+        ``(arc, radius, damage)`` blast.
+
+        Overlapping blasts are summed with a difference array over ``by_arc``,
+        so the batch costs two binary searches per blast plus one pass over
+        the hit stretch, with no per-enemy distance checks. Distance along
+        the path is never shorter than the straight line, so everyone hit is
+        within ``radius``.
+        """
+        if not blasts or not self.by_arc:
+            return
+        totals = [0.0] * (len(self.by_arc) + 1)
+        first, last = len(self.by_arc), 0
+        for arc, radius, damage in blasts:
+            low, high = self.span(arc - radius, arc + radius)
+            if low < high:
+                totals[low] += damage
+                totals[high] -= damage
+                first, last = min(first, low), max(last, high)
+        damage = 0.0
+        for i in range(first, last):
+            damage += totals[i]
+            enemy = self.by_arc[i]
+            if damage > 1e-9 and enemy.alive:
+                enemy.take_damage(damage)
+
+    def __len__(self):
+        return len(self.by_arc)
+
+
+class LaneIndex:
+    """One EnemyIndex per lane of the current map, filed by ``enemy.lane``.
+
+    Lanes that merge or run side by side keep separate arc-length orders,
+    so a tick sorts each lane's enemies once and a map with several lanes
+    costs about the same as one path carrying the same enemies.
+    """
+
+    def __init__(self):
+        self.paths = ()
+        self.lanes = ()
+
+    def set_lanes(self, paths):
+        """Switch to another map; call rebuild to file the enemies again"""
+        self.paths = paths
+        self.lanes = tuple(EnemyIndex() for _ in paths)
+        for lane, path in zip(self.lanes, paths):
+            lane.set_path(path)
+
+    def arc(self, enemy):
+        return self.lanes[enemy.lane].arc(enemy)
+
+    def add(self, enemies):
+        for enemy in enemies:
+            self.lanes[enemy.lane].by_arc.append(enemy)
+
+    def refresh(self):
+        for lane in self.lanes:
+            lane.refresh()
+
+    def rebuild(self, enemies):
+        for lane in self.lanes:
+            lane.by_arc = []
+        self.add(enemies)
+        self.refresh()
+
+    def apply_blasts(self, blasts):
+        """Resolve ``(target, radius, damage)`` blasts lane by lane.
+
+        A blast only reaches enemies on its target's lane, including where
+        that lane shares road with another one.
+        """
+        by_lane = [[] for _ in self.lanes]
+        for target, radius, damage in blasts:
+            by_lane[target.lane].append((self.arc(target), radius, damage))
+        for lane, lane_blasts in zip(self.lanes, by_lane):
+            lane.apply_blasts(lane_blasts)
+
+    def __len__(self):
+        return sum(len(lane) for lane in self.lanes)
+
+
+class NeighbourGrid:
+    """Items filed into square cells by their ``x`` and ``y``, so the items
+    near a point are found without looking at all of them."""
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def rebuild(self, items):
+        size = self.cell_size
+        cells = {}
+        for item in items:
+            key = (int(item.x // size), int(item.y // size))
+            if key in cells:
+                cells[key].append(item)
+            else:
+                cells[key] = [item]
+        self.cells = cells
+
+    def around(self, x, y, radius):
+        """Items in the cells that overlap the square around (x, y); callers
+        check the exact distance"""
+        size = self.cell_size
+        cells = self.cells
+        for cell_x in range(int((x - radius) // size), int((x + radius) // size) + 1):
+            for cell_y in range(int((y - radius) // size), int((y + radius) // size) + 1):
+                yield from cells.get((cell_x, cell_y), ())
+
+
+class FieldIndex:
+    """Enemies on an open maze grid, filed into square buckets by position.
+
+    Without a fixed path there are no arc-length intervals to search, so
+    range queries only visit the buckets under a tower's circle. First and
+    Last compare the steps each enemy has left on the shared flow field.
+    """
+
+    def __init__(self, field, bucket_size):
+        self.field = field
+        self.enemies = []
+        self.buckets = NeighbourGrid(bucket_size)
+
+    def add(self, enemies):
+        self.enemies.extend(enemies)
+
+    def refresh(self):
+        """Drop dead enemies and file everyone by where they moved to"""
+        self.enemies = [enemy for enemy in self.enemies if enemy.alive]
+        self.buckets.rebuild(self.enemies)
+
+    def rebuild(self, enemies):
+        self.enemies = list(enemies)
+        self.refresh()
+
+    def steps_left(self, enemy):
+        return self.field.steps_left(enemy.x, enemy.y)
+
+    def near(self, x, y, radius):
+        """Live enemies within ``radius`` of (x, y)"""
+        reach = radius * radius
+        for enemy in self.buckets.around(x, y, radius):
+            if enemy.alive and (enemy.x - x) ** 2 + (enemy.y - y) ** 2 <= reach:
+                yield enemy
+
+    def find_target(self, x, y, radius, priority):
+        in_range = self.near(x, y, radius)
+        if priority is TargetPriority.FIRST:
+            return min(in_range, key=self.steps_left, default=None)
+        if priority is TargetPriority.LAST:
+            return max(in_range, key=self.steps_left, default=None)
+        if priority is TargetPriority.NEAREST:
+            return min(in_range, key=lambda enemy: (enemy.x - x) ** 2 + (enemy.y - y) ** 2, default=None)
+        return max(in_range, key=PRIORITY_SCORES[priority], default=None)
+
+    def apply_blasts(self, blasts):
+        """Damage every live enemy within ``radius`` of each ``(target, radius, damage)`` blast"""
+        for target, radius, damage in blasts:
+            for enemy in list(self.near(target.x, target.y, radius)):
+                enemy.take_damage(damage)
+
+    def __len__(self):
+        return len(self.enemies)
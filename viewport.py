@@ -0,0 +1,428 @@
+import itertools
+import math
+from collections import OrderedDict
+
+import pygame
+
+
+class Viewport:
+    """Maps world coordinates onto the surface the world is rendered into.
+
+    The camera shows a ``view_size`` window of a ``map_size`` world, starting
+    at (camera_x, camera_y); zooming in shrinks that window. It is drawn at
+    ``render_scale`` times the size of the on-screen field rect and
+    stretched onto it by ``present``. At render scale 1.0 the surface is the
+    field area of the screen itself, so there is no extra copy. ``scale`` is
+    the resulting number of surface pixels per world unit.
+    """
+
+    def __init__(self, screen, field_rect, view_size, map_size, scale=1.0, sprites=None):
+        self.screen = screen
+        self.field_rect = pygame.Rect(field_rect)
+        self.base_width, self.base_height = view_size
+        self.view_width, self.view_height = view_size
+        self.map_width, self.map_height = map_size
+        self.camera_x = 0
+        self.camera_y = 0
+        self.zoom = 1.0
+        self.sprites = sprites if sprites is not None else SpriteCache()
+        self._fonts = {}
+        self._shapes = {}  # Prerendered circles, bars and text
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        """Change the render scale, the resolution the field is drawn at"""
+        self.render_scale = scale
+        if scale == 1.0:
+            self.surface = self.screen.subsurface(self.field_rect)
+        else:
+            size = (round(self.field_rect.width * scale), round(self.field_rect.height * scale))
+            self.surface = pygame.Surface(size).convert()
+        self._update_scale()
+
+    def set_zoom(self, zoom, anchor=None):
+        """Magnify the world by ``zoom``, keeping the world point ``anchor``
+        (the view centre by default) at the same place on screen"""
+        if anchor is None:
+            anchor = (self.camera_x + self.view_width / 2, self.camera_y + self.view_height / 2)
+        fraction_x = (anchor[0] - self.camera_x) / self.view_width
+        fraction_y = (anchor[1] - self.camera_y) / self.view_height
+        self.zoom = zoom
+        self.view_width = self.base_width / zoom
+        self.view_height = self.base_height / zoom
+        self.camera_x = anchor[0] - fraction_x * self.view_width
+        self.camera_y = anchor[1] - fraction_y * self.view_height
+        self.scroll(0, 0)
+        self._update_scale()
+
+    def _update_scale(self):
+        self.scale = self.render_scale * self.zoom
+        # Fonts and shapes are cached at the size they are drawn at. Sprites
+        # keep their variants for every scale, so zooming back is free.
+        self._fonts.clear()
+        self._shapes.clear()
+
+    def scroll(self, dx, dy):
+        """Move the camera by a world distance, keeping the view inside the map"""
+        self.camera_x = min(max(0, self.camera_x + dx), self.map_width - self.view_width)
+        self.camera_y = min(max(0, self.camera_y + dy), self.map_height - self.view_height)
+
+    def center_on(self, x, y):
+        self.scroll(x - self.view_width / 2 - self.camera_x, y - self.view_height / 2 - self.camera_y)
+
+    @property
+    def visible_rect(self):
+        """World area inside the view"""
+        return pygame.Rect(self.camera_x, self.camera_y, self.view_width, self.view_height)
+
+    def to_screen(self, x, y):
+        """World position -> pixel position on the render surface"""
+        return ((x - self.camera_x) * self.scale, (y - self.camera_y) * self.scale)
+
+    def length(self, distance):
+        return distance * self.scale
+
+    def rect(self, x, y, width, height):
+        return pygame.Rect((x - self.camera_x) * self.scale, (y - self.camera_y) * self.scale,
+                           max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+
+    def screen_to_world(self, pos):
+        """Window position -> world position, or None outside the field"""
+        if not self.field_rect.collidepoint(pos):
+            return None
+        x = self.camera_x + (pos[0] - self.field_rect.x) * self.view_width / self.field_rect.width
+        y = self.camera_y + (pos[1] - self.field_rect.y) * self.view_height / self.field_rect.height
+        return (int(x), int(y))
+
+    def font(self, size):
+        size = max(8, round(size * self.scale))
+        if size not in self._fonts:
+            self._fonts[size] = pygame.font.SysFont(None, size)
+        return self._fonts[size]
+
+    def sprite(self, key, image):
+        """``image`` scaled to the current scale, cached under ``key``"""
+        if self.scale == 1.0:
+            return image
+        return self.sprites.get(key, image, self.scale)
+
+    def circle(self, color, radius, width=0):
+        """Cached sprite of a circle with a world ``radius``, drawn centred"""
+        key = ("circle", color, radius, width)
+        if key not in self._shapes:
+            pixels = max(1, self.length(radius))
+            size = int(pixels) * 2 + 2
+            image = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(image, color, (size / 2, size / 2), pixels, width)
+            self._shapes[key] = image
+        return self._shapes[key]
+
+    def fill(self, color, size):
+        """Cached solid block of a pixel ``size``"""
+        key = ("fill", color, size)
+        if key not in self._shapes:
+            image = pygame.Surface(size).convert()
+            image.fill(color)
+            self._shapes[key] = image
+        return self._shapes[key]
+
+    def text(self, text, size, color):
+        """Cached rendering of a label that repeats across frames"""
+        key = ("text", text, size, color)
+        if key not in self._shapes:
+            self._shapes[key] = self.font(size).render(text, True, color)
+        return self._shapes[key]
+
+    def present(self):
+        """Stretch the rendered world onto the field area of the screen"""
+        # Only the render scale decides whether the world was drawn off screen; zoom doesn't
+        if self.render_scale != 1.0:
+            pygame.transform.scale(self.surface, self.field_rect.size,
+                                   self.screen.subsurface(self.field_rect))
+
+
+class SpriteCache:
+    """Scaled variants of sprites, one per scale they have been drawn at.
+
+    Like the levels of a mipmap, each zoom level gets its own copy scaled
+    once, so a frame never scales a sprite. Variants are built on first use
+    and the least recently used ones are dropped once they hold more than
+    ``max_pixels``. ``load_source(key)``, when given, returns a full-size
+    original to scale from, so zoomed-in variants stay sharp instead of
+    being blown up from the small in-game sprite.
+    """
+
+    def __init__(self, max_pixels=8_000_000, load_source=None):
+        self.max_pixels = max_pixels
+        self.load_source = load_source
+        self.pixels = 0
+        self.hits = self.misses = self.evictions = 0
+        self._variants = OrderedDict()
+        self._no_source = set()  # Keys without an original larger than the sprite
+
+    def get(self, key, image, scale):
+        cache_key = (key, round(scale, 3))
+        variant = self._lookup(cache_key)
+        if variant is not None:
+            self.hits += 1
+            return variant
+        self.misses += 1
+        width, height = image.get_size()
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        variant = pygame.transform.smoothscale(self._source(key, image, size), size)
+        # Keep the blit fast path of the original: opaque stays opaque
+        variant = variant.convert_alpha() if image.get_flags() & pygame.SRCALPHA else variant.convert()
+        self._store(cache_key, variant)
+        return variant
+
+    def _source(self, key, image, size):
+        """Image to scale from: the original when upscaling past ``image``.
+
+        Originals are cached under ``(key, None)`` and evicted like variants.
+        """
+        if self.load_source is None or size[0] <= image.get_width() or key in self._no_source:
+            return image
+        source = self._lookup((key, None))
+        if source is None:
+            try:
+                # smoothscale needs a 32 bit surface
+                source = self.load_source(key).convert_alpha()
+            except (pygame.error, FileNotFoundError):
+                source = None
+            if source is None or source.get_width() <= image.get_width():
+                self._no_source.add(key)
+                return image
+            self._store((key, None), source)
+        return source
+
+    def _lookup(self, cache_key):
+        image = self._variants.get(cache_key)
+        if image is not None:
+            self._variants.move_to_end(cache_key)
+        return image
+
+    def _store(self, cache_key, image):
+        self._variants[cache_key] = image
+        self.pixels += image.get_width() * image.get_height()
+        while self.pixels > self.max_pixels and len(self._variants) > 1:
+            _, evicted = self._variants.popitem(last=False)
+            self.pixels -= evicted.get_width() * evicted.get_height()
+            self.evictions += 1
+
+    def clear(self):
+        self._variants.clear()
+        self.pixels = 0
+
+    def __len__(self):
+        return len(self._variants)
+
+
+class ChunkCache:
+    """Static world content cut into square chunks, each rendered the first
+    time it comes into view.
+
+    Only chunks overlapping the view are rendered or drawn, so a frame costs
+    the same on a map several screens wide as on one that fits the screen.
+    Once the chunks hold more than ``max_pixels``, the least recently drawn
+    ones outside the view are dropped, so memory follows the view rather
+    than how much of the map has been scrolled over.
+    ``render(surface, world_rect, scale)`` draws one chunk's area of the world.
+    """
+
+    def __init__(self, chunk_size, render, max_pixels=12_000_000):
+        self.chunk_size = chunk_size
+        self.render = render
+        self.max_pixels = max_pixels
+        self.pixels = 0
+        self._chunks = OrderedDict()
+        self._key = None
+
+    def invalidate(self, key):
+        """Drop every chunk when ``key`` (what the content depends on) changes"""
+        if key != self._key:
+            self._chunks.clear()
+            self.pixels = 0
+            self._key = key
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def draw(self, view, surface):
+        size = self.chunk_size
+        visible = view.visible_rect
+        first_x, last_x = visible.left // size, (min(visible.right, view.map_width) - 1) // size
+        first_y, last_y = visible.top // size, (min(visible.bottom, view.map_height) - 1) // size
+        chunks = self._chunks
+        blits = []
+        for chunk_x in range(first_x, last_x + 1):
+            for chunk_y in range(first_y, last_y + 1):
+                chunk = chunks.get((chunk_x, chunk_y))
+                if chunk is None:
+                    chunk = chunks[chunk_x, chunk_y] = self._render_chunk(view, chunk_x, chunk_y)
+                    self.pixels += chunk.get_width() * chunk.get_height()
+                else:
+                    chunks.move_to_end((chunk_x, chunk_y))
+                x, y = view.to_screen(chunk_x * size, chunk_y * size)
+                blits.append((chunk, (math.floor(x), math.floor(y))))
+        # The chunks just drawn are the most recent, so only ones out of view go
+        while self.pixels > self.max_pixels and len(chunks) > len(blits):
+            _, evicted = chunks.popitem(last=False)
+            self.pixels -= evicted.get_width() * evicted.get_height()
+        surface.blits(blits, doreturn=False)
+
+    def _render_chunk(self, view, chunk_x, chunk_y):
+        # One spare pixel overlaps the next chunk, so fractional scales leave no seams
+        pixels = math.ceil(view.length(self.chunk_size)) + 1
+        surface = pygame.Surface((pixels, pixels)).convert()
+        size = self.chunk_size
+        self.render(surface, pygame.Rect(chunk_x * size, chunk_y * size, size, size), view.scale)
+        return surface
+
+
+class SpriteBatch:
+    """Collects a frame's blits by layer and draws them with one ``Surface.blits`` call.
+
+    Lower layers are drawn first; blits within a layer keep the order they were added in.
+    """
+
+    def __init__(self, layers):
+        self._layers = [[] for _ in range(layers)]
+
+    def add(self, layer, image, dest, area=None):
+        self._layers[layer].append((image, dest) if area is None else (image, dest, area))
+
+    def __len__(self):
+        return sum(len(layer) for layer in self._layers)
+
+    def flush(self, surface):
+        surface.blits(itertools.chain.from_iterable(self._layers), doreturn=False)
+        for layer in self._layers:
+            layer.clear()
+
+
+class LevelOfDetail:
+    """Chooses how much per-entity detail to draw from the entity count and frame time.
+
+    Every threshold in ``entity_thresholds`` the count reaches drops one
+    level. Averaging over ``frame_budget`` drops one more, until frames are
+    back under 70% of the budget.
+    """
+
+    FULL, REDUCED, MINIMAL = range(3)
+    NAMES = ("full", "reduced", "minimal")
+
+    def __init__(self, entity_thresholds, frame_budget):
+        self.entity_thresholds = entity_thresholds
+        self.frame_budget = frame_budget
+        self.average = frame_budget / 2
+        self.over_budget = False
+        self.level = self.FULL
+
+    def record_frame_time(self, frame_time):
+        self.average += (frame_time - self.average) * 0.05
+        if self.average > self.frame_budget:
+            self.over_budget = True
+        elif self.average < self.frame_budget * 0.7:
+            self.over_budget = False
+
+    def update(self, entity_count):
+        """Level to draw this frame at"""
+        level = sum(1 for threshold in self.entity_thresholds if entity_count >= threshold)
+        self.level = min(self.MINIMAL, level + self.over_budget)
+        return self.level
+
+
+class AutoRenderScale:
+    """Steps the render scale down while frames run over budget and back up
+    once there is clear headroom, waiting between changes to avoid flapping.
+    """
+
+    def __init__(self, scales, frame_budget, settle_frames=120):
+        self.scales = sorted(scales)
+        self.frame_budget = frame_budget
+        self.settle_frames = settle_frames
+        self.average = frame_budget / 2
+        self.frames_since_change = 0
+
+    def update(self, scale, frame_time):
+        """Feed one frame's work time, return the scale to render at next"""
+        self.average += (frame_time - self.average) * 0.05
+        self.frames_since_change += 1
+        if self.frames_since_change < self.settle_frames:
+            return scale
+        index = self.scales.index(scale) if scale in self.scales else len(self.scales) - 1
+        if self.average > self.frame_budget and index > 0:
+            index -= 1
+        elif index < len(self.scales) - 1:
+            # Rendering cost grows with the pixel count, so only step up when
+            # the larger scale is predicted to stay comfortably within budget
+            predicted = self.average * (self.scales[index + 1] / scale) ** 2
+            if predicted > self.frame_budget * 0.8:
+                return scale
+            index += 1
+        else:
+            return scale
+        self.frames_since_change = 0
+        return self.scales[index]
+
+
+class Minimap:
+    """Overview of the whole map, fitted into ``rect`` on the screen.
+
+    The background is rendered once per map at the minimap's own scale.
+    Entity dots are plotted onto a copy of it every ``refresh_frames``
+    frames, merged per minimap pixel, so a refresh fills at most one dot per
+    pixel however many enemies there are. Other frames only blit the result
+    and the camera frame.
+    """
+
+    def __init__(self, rect, map_size, refresh_frames=6):
+        self.map_width, self.map_height = map_size
+        area = pygame.Rect(rect)
+        self.scale = min(area.width / self.map_width, area.height / self.map_height)
+        self.rect = pygame.Rect(0, 0, round(self.map_width * self.scale), round(self.map_height * self.scale))
+        self.rect.center = area.center
+        self.refresh_frames = refresh_frames
+        self._background = None
+        self._image = None
+        self._key = None
+        self._frames = 0
+
+    def set_background(self, key, render):
+        """Render the background again when ``key`` (what it depends on) changes.
+
+        ``render(surface, world_rect, scale)`` draws an area of the world.
+        """
+        if key == self._key:
+            return
+        self._key = key
+        self._background = pygame.Surface(self.rect.size).convert()
+        render(self._background, pygame.Rect(0, 0, self.map_width, self.map_height), self.scale)
+        self._image = None
+
+    def due(self):
+        """Whether the dots should be plotted again this frame"""
+        self._frames += 1
+        return self._image is None or self._frames >= self.refresh_frames
+
+    def plot(self, layers):
+        """Redraw the dots from ``(color, size, positions)`` layers, in order"""
+        self._frames = 0
+        self._image = self._background.copy()
+        scale = self.scale
+        for color, size, positions in layers:
+            offset = size // 2
+            for x, y in {(int(x * scale) - offset, int(y * scale) - offset) for x, y in positions}:
+                self._image.fill(color, (x, y, size, size))
+
+    def draw(self, surface, view, frame_color):
+        surface.blit(self._image, self.rect)
+        camera = pygame.Rect(self.rect.x + view.camera_x * self.scale, self.rect.y + view.camera_y * self.scale,
+                             view.view_width * self.scale, view.view_height * self.scale)
+        pygame.draw.rect(surface, frame_color, camera.clip(self.rect), 1)
+
+    def to_world(self, pos):
+        """Screen position -> world position, or None outside the minimap"""
+        if not self.rect.collidepoint(pos):
+            return None
+        return ((pos[0] - self.rect.x) / self.scale, (pos[1] - self.rect.y) / self.scale)